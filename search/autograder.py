@@ -24,6 +24,7 @@ import random
 random.seed(0)
 try: 
     from pacman import GameState
+    GameState.trackExplored() # Tests may count the states agents explore
 except:
     pass
 
@@ -0,0 +1,91 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Measures how fast whole games run, in moves per second, without graphics.
+The games are seeded, so runs with the same options play the same games
+and can be compared before and after a change:
+
+> python benchmark.py -l mediumClassic -l originalClassic -n 10
+"""
+
+import random
+import sys
+import time
+import layout
+import textDisplay
+from util import LatencyHistogram
+from pacman import ClassicGameRules, loadAgent
+
+def benchmarkLayout( layoutName, pacmanType, ghostType, numGames, seed=0, catchExceptions=False ):
+    """
+    Plays numGames quiet games on a layout, with a new agent of each type per
+    game, and returns (moves played, seconds taken, latencies): latencies is
+    a LatencyHistogram of the time per move for Pacman and one for the ghosts.
+    """
+    lay = layout.getLayout( layoutName )
+    if lay == None: raise Exception("The layout " + layoutName + " cannot be found")
+    rules = ClassicGameRules()
+    rules.quiet = True
+    random.seed( seed )
+    moves = 0
+    latencies = [LatencyHistogram(), LatencyHistogram()]
+    start = time.time()
+    for i in range( numGames ):
+        ghosts = [ghostType( index + 1 ) for index in range( lay.getNumGhosts() )]
+        game = rules.newGame( lay, pacmanType(), ghosts, textDisplay.NullGraphics(), True, catchExceptions )
+        game.run()
+        moves += len( game.moveHistory )
+        for index, histogram in enumerate( game.moveLatencies ):
+            latencies[min( index, 1 )].merge( histogram )
+    return moves, time.time() - start, latencies
+
+def readCommand( argv ):
+    "Processes the command used to run the benchmark from the command line"
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python benchmark.py <options>
+    EXAMPLES:   python benchmark.py -l mediumClassic -l originalClassic -n 10
+                    - plays 10 games on each layout and reports moves per second
+    """
+    parser = OptionParser( usageStr )
+    parser.add_option('-l', '--layout', dest='layouts', action='append',
+                      help='A layout to play on; may be given more than once [Default: mediumClassic, originalClassic]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=10,
+                      help='The number of games to play on each layout [Default: %default]')
+    parser.add_option('-p', '--pacman', dest='pacman', default='GreedyAgent',
+                      help='The Pacman agent TYPE [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='The ghost agent TYPE [Default: %default]')
+    parser.add_option('-s', '--seed', dest='seed', type='int', default=0,
+                      help='Random seed for the games [Default: %default]')
+    parser.add_option('-c', '--catchExceptions', action='store_true', dest='catchExceptions', default=False,
+                      help='Play with exception handling and timeouts on, as graded games are')
+    options, otherjunk = parser.parse_args( argv )
+    if len( otherjunk ) != 0:
+        raise Exception('Command line input not understood: ' + str( otherjunk ))
+    if not options.layouts: options.layouts = ['mediumClassic', 'originalClassic']
+    return options
+
+if __name__ == '__main__':
+    options = readCommand( sys.argv[1:] )
+    pacmanType = loadAgent( options.pacman, True )
+    ghostType = loadAgent( options.ghost, True )
+    for layoutName in options.layouts:
+        moves, elapsed, latencies = benchmarkLayout( layoutName, pacmanType, ghostType, options.numGames,
+                                                     options.seed, options.catchExceptions )
+        print '%-18s %4d games %7d moves in %7.2f seconds: %8.0f moves/s' % \
+              ( layoutName, options.numGames, moves, elapsed, moves / max( elapsed, 1e-6 ) )
+        print '    Pacman: %s' % latencies[0]
+        print '    Ghosts: %s' % latencies[1]
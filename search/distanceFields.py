@@ -0,0 +1,143 @@
+# distanceFields.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Breadth first distance fields over a walls Grid.
+
+A distance field holds, for every cell, the maze distance to the nearest of
+some source positions, or UNREACHABLE for walls and cells no source can
+reach; it is indexed like a Grid, field[x][y].  With NumPy installed the
+fields are computed by growing the whole frontier at once with array shifts
+(one NumPy operation per step of distance rather than one Python operation
+per cell), and many single-source fields are grown together as the layers
+of one array.  Without NumPy, or with USE_NUMPY set to False, the same
+results come from breadth first searches in pure Python:
+
+> field = distanceField(walls, food.asList())   # nearest food, everywhere
+> fields = distanceFields(walls, corners)       # one field per corner
+> matrix = mazeDistanceMatrix(walls, ghostPositions, [pacmanPosition])
+"""
+
+from game import getAdjacency
+import binascii
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Use NumPy when it is installed
+USE_NUMPY = numpy is not None
+
+UNREACHABLE = -1
+
+# Number of single-source fields grown together by the NumPy engine
+BATCH_SIZE = 64
+
+def distanceField(walls, sources):
+    """
+    Returns the distance field from the nearest of the source positions
+    (one multi-source breadth first search).
+    """
+    if USE_NUMPY:
+        return _numpyFields(walls, [list(sources)])[0]
+    return _pythonField(walls, sources)
+
+def distanceFields(walls, sources):
+    "Returns a list with one distance field per source position"
+    sources = list(sources)
+    if USE_NUMPY:
+        fields = []
+        for start in range(0, len(sources), BATCH_SIZE):
+            batch = [[source] for source in sources[start:start + BATCH_SIZE]]
+            fields.extend(_numpyFields(walls, batch))
+        return fields
+    return [_pythonField(walls, [source]) for source in sources]
+
+def mazeDistanceMatrix(walls, positions, targets=None):
+    """
+    Returns matrix[i][j], the maze distance from positions[i] to targets[j]
+    (to positions[j] if no targets are given), or UNREACHABLE.
+    """
+    if targets is None: targets = positions
+    fields = distanceFields(walls, positions)
+    if USE_NUMPY and fields:
+        xs = numpy.array([x for x, y in targets], dtype=int)
+        ys = numpy.array([y for x, y in targets], dtype=int)
+        return numpy.array(fields)[:, xs, ys]
+    return [[field[x][y] for x, y in targets] for field in fields]
+
+def manhattanMatrix(positions, targets=None):
+    """
+    Returns matrix[i][j], the Manhattan distance from positions[i] to
+    targets[j] (to positions[j] if no targets are given).
+    """
+    if targets is None: targets = positions
+    if USE_NUMPY and positions and targets:
+        a, b = numpy.array(positions), numpy.array(targets)
+        return numpy.abs(a[:, numpy.newaxis, :] - b[numpy.newaxis, :, :]).sum(axis=2)
+    return [[abs(x1 - x2) + abs(y1 - y2) for x2, y2 in targets] for x1, y1 in positions]
+
+def wallsArray(walls):
+    "Returns a walls Grid as a (width, height) NumPy array of booleans"
+    numCells = walls.width * walls.height
+    numBytes = (numCells + 7) // 8
+    packed = binascii.unhexlify('%0*x' % (2 * numBytes, walls.bits))
+    # Bit i of the Grid is cell (i // height, i % height); the hex string is big-endian
+    bits = numpy.unpackbits(numpy.frombuffer(packed, dtype=numpy.uint8))[::-1]
+    return bits[:numCells].reshape(walls.width, walls.height).astype(bool)
+
+def _numpyFields(walls, sourceLists):
+    "Grows one field per list of sources, all at once, as layers of one array"
+    openCells = ~wallsArray(walls)
+    shape = (len(sourceLists), walls.width, walls.height)
+    field = numpy.empty(shape, dtype=numpy.int32)
+    field.fill(UNREACHABLE)
+    frontier = numpy.zeros(shape, dtype=bool)
+    for layer, sources in enumerate(sourceLists):
+        for x, y in sources:
+            frontier[layer, x, y] = openCells[x, y]
+    unvisited = openCells & ~frontier
+    field[frontier] = 0
+    distance = 0
+    while frontier.any():
+        distance += 1
+        grown = numpy.zeros(shape, dtype=bool)
+        grown[:, 1:, :] |= frontier[:, :-1, :]
+        grown[:, :-1, :] |= frontier[:, 1:, :]
+        grown[:, :, 1:] |= frontier[:, :, :-1]
+        grown[:, :, :-1] |= frontier[:, :, 1:]
+        frontier = grown & unvisited
+        unvisited &= ~frontier
+        field[frontier] = distance
+    return list(field)
+
+def _pythonField(walls, sources):
+    "Breadth first search from all the sources over the layout's adjacency"
+    adjacency = getAdjacency(walls)
+    height, neighbors = walls.height, adjacency.neighbors
+    distance = [UNREACHABLE] * (walls.width * height)
+    queue = []
+    for x, y in sources:
+        cell = x * height + y
+        if not walls[x][y] and distance[cell] == UNREACHABLE:
+            distance[cell] = 0
+            queue.append(cell)
+    for cell in queue:
+        d = distance[cell] + 1
+        for next in neighbors[cell]:
+            if distance[next] == UNREACHABLE:
+                distance[next] = d
+                queue.append(next)
+    return [distance[x * height:(x + 1) * height] for x in range(walls.width)]
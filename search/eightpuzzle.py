@@ -14,10 +14,16 @@
 
 import search
 import random
+import array
+import collections
+import os
+import tempfile
+import time
+import util
 
 # Module Classes
 
-class EightPuzzleState:
+class EightPuzzleState(object):
     """
     The Eight Puzzle is described in the course textbook on
     page 64.
@@ -25,7 +31,13 @@ class EightPuzzleState:
     This class defines the mechanics of the puzzle itself.  The
     task of recasting this puzzle as a search problem is left to
     the EightPuzzleSearchProblem class.
+
+    A state is packed into one integer: four bits per position, row by row,
+    holding the number at that position (position p is row p / 3, column
+    p % 3).  Moves just move one number between two nibbles, and hashing
+    and equality compare a single integer.
     """
+    __slots__ = ('packed', 'blank')
 
     def __init__( self, numbers ):
         """
@@ -46,18 +58,14 @@ class EightPuzzleState:
             | 6 | 7 | 8 |
             ------------
 
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        The configuration of the puzzle is stored in the integer 'packed',
+        and the position of the blank in 'blank'.
         """
-        self.cells = []
-        numbers = numbers[:] # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range( 3 ):
-            self.cells.append( [] )
-            for col in range( 3 ):
-                self.cells[row].append( numbers.pop() )
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        packed = 0
+        for position, number in enumerate(numbers):
+            packed |= number << 4 * position
+        self.packed = packed
+        self.blank = list(numbers).index(0)
 
     def isGoal( self ):
         """
@@ -77,13 +85,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
         False
         """
-        current = 0
-        for row in range( 3 ):
-            for col in range( 3 ):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.packed == _GOAL
 
     def legalMoves( self ):
         """
@@ -95,17 +97,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
         ['down', 'right']
         """
-        moves = []
-        row, col = self.blankLocation
-        if(row != 0):
-            moves.append('up')
-        if(row != 2):
-            moves.append('down')
-        if(col != 0):
-            moves.append('left')
-        if(col != 2):
-            moves.append('right')
-        return moves
+        return [move for move, position in _MOVES[self.blank]]
 
     def result(self, move):
         """
@@ -113,37 +105,44 @@ class EightPuzzleState:
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves will raise an exception.
 
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if(move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif(move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif(move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif(move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise "Illegal Move"
+        position = _TARGETS[self.blank].get(move)
+        if position is None:
+            raise Exception('Illegal Move: %s' % move)
+        # Slide the number at position into the blank, whose nibble is 0
+        number = (self.packed >> 4 * position) & 0xF
+        newPuzzle = EightPuzzleState.__new__(EightPuzzleState)
+        newPuzzle.packed = self.packed - (number << 4 * position) + (number << 4 * self.blank)
+        newPuzzle.blank = position
+        return newPuzzle
 
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
+    def numbers(self):
+        "Returns the numbers of the puzzle, row by row, as passed to the constructor"
+        return [(self.packed >> 4 * position) & 0xF for position in range(9)]
 
-        return newPuzzle
+    def tilePositions(self):
+        """
+          Returns a list giving the position (row * 3 + col) of each
+        number, the blank included, so tilePositions()[n] is where n is.
+        """
+        positions = [0] * 9
+        packed = self.packed
+        for position in range(9):
+            positions[packed & 0xF] = position
+            packed >>= 4
+        return positions
+
+    def _getCells(self):
+        numbers = self.numbers()
+        return [numbers[row * 3:row * 3 + 3] for row in range( 3 )]
+
+    # The configuration as a list of rows, and the blank's (row, col)
+    cells = property(_getCells)
+    blankLocation = property(lambda self: divmod(self.blank, 3))
 
     # Utilities for comparison and display
     def __eq__(self, other):
@@ -155,13 +154,20 @@ class EightPuzzleState:
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range( 3 ):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return isinstance(other, EightPuzzleState) and self.packed == other.packed
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.packed)
+
+    # Slotted instances have no __dict__, so pickle needs to be given the state
+    def __getstate__(self):
+        return (self.packed, self.blank)
+
+    def __setstate__(self, state):
+        self.packed, self.blank = state
 
     def __getAsciiString(self):
         """
@@ -183,6 +189,21 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
+_GOAL = sum([number << 4 * number for number in range(9)])
+
+def _moveTable():
+    "For each blank position, the legal (move, position of the number that slides in)"
+    table = []
+    for blank in range(9):
+        row, col = divmod(blank, 3)
+        table.append([(move, blank + step) for move, step, legal in
+                      [('up', -3, row != 0), ('down', 3, row != 2),
+                       ('left', -1, col != 0), ('right', 1, col != 2)] if legal])
+    return table
+
+_MOVES = _moveTable()
+_TARGETS = [dict(moves) for moves in _MOVES]
+
 # TODO: Implement The methods in this class
 
 class EightPuzzleSearchProblem(search.SearchProblem):
@@ -196,7 +217,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -262,7 +283,199 @@ def createRandomEightPuzzle(moves=100):
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+# Heuristics
+#
+# Position p of the puzzle is row p / 3, column p % 3, and in the goal state
+# number n is at position n.  All of these can be passed to aStarSearch.
+
+def manhattanHeuristic(state, problem=None):
+    "The sum of the Manhattan distances of the tiles from their goal positions"
+    positions = state.tilePositions()
+    return sum([_MANHATTAN[tile][positions[tile]] for tile in range(1, 9)])
+
+def linearConflictHeuristic(state, problem=None):
+    """
+      The Manhattan distance plus two moves for every tile that has to leave
+    its row (or column) to let another tile in the same goal row (column) go
+    past it.
+    """
+    board = [0] * 9
+    for tile, position in enumerate(state.tilePositions()):
+        board[position] = tile
+    return manhattanHeuristic(state) + 2 * _lineConflicts(board)
+
+def patternDatabaseHeuristic(state, problem=None):
+    """
+      The sum of the costs from the disjoint pattern databases for PATTERNS.
+    Each database only counts moves of its own tiles, so the sum never
+    overestimates.
+    """
+    positions = state.tilePositions()
+    return sum([getPatternDatabase(tiles).cost(positions) for tiles in PATTERNS])
+
+_MANHATTAN = [[abs(p / 3 - tile / 3) + abs(p % 3 - tile % 3) for p in range(9)] for tile in range(9)]
+
+def _lineConflicts(board):
+    """
+      Counts the tiles that must leave their goal row or column: in each
+    line, the tiles that belong there minus the longest run of them that is
+    already in goal order.  board[p] is the number at position p.
+    """
+    conflicts = 0
+    for line in range(3):
+        row = [tile for tile in board[line * 3:line * 3 + 3] if tile and tile / 3 == line]
+        column = [tile for tile in board[line::3] if tile and tile % 3 == line]
+        conflicts += len(row) - _longestIncreasing(row) + len(column) - _longestIncreasing(column)
+    return conflicts
+
+def _longestIncreasing(order):
+    "The length of the longest increasing subsequence of order"
+    best = [1] * len(order)
+    for i in range(len(order)):
+        for j in range(i):
+            if order[j] < order[i]: best[i] = max(best[i], best[j] + 1)
+    return max(best + [0])
+
+# Pattern databases
+
+# Disjoint groups of tiles with one database each
+PATTERNS = ((1, 2, 3, 4), (5, 6, 7, 8))
+
+# Directory for the on-disk database cache (None disables it)
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'pacman-eight-puzzle')
+
+_databases = {} # tiles -> PatternDatabase
+
+def getPatternDatabase(tiles):
+    """
+      Returns the PatternDatabase for a tuple of tiles, from the memory
+    cache, the disk cache or by building it, in that order.
+    """
+    if tiles not in _databases:
+        name = _cacheName(tiles)
+        table = util.loadCachedTable(CACHE_DIR, name, 9 ** len(tiles) * 9)
+        if table is None:
+            database = PatternDatabase(tiles)
+            util.saveCachedTable(CACHE_DIR, name, database.table)
+        else:
+            database = PatternDatabase(tiles, table)
+        _databases[tiles] = database
+    return _databases[tiles]
+
+class PatternDatabase:
+    """
+      The fewest moves of the given tiles needed to bring them to their goal
+    positions, whatever the other tiles do, for every placement of them and
+    the blank.  With tile tiles[i] at position p_i and the blank at b, that
+    is entry sum(p_i * 9 ** i) * 9 + b of a byte table.  Keeping the blank
+    in the entry keeps the heuristic consistent, which the cost minimised
+    over every blank position would not be.
+    """
+    def __init__(self, tiles, table=None):
+        self.tiles = tiles
+        if table is None:
+            table = self._build()
+        elif not isinstance(table, array.array):
+            buffer, table = table, array.array('B')
+            table.fromstring(buffer[:])
+        self.table = table
+        self._entry = table.__getitem__
+
+    def cost(self, positions):
+        "Looks up the cost for a tilePositions() list"
+        index = 0
+        for tile in reversed(self.tiles):
+            index = index * 9 + positions[tile]
+        return self._entry(index * 9 + positions[0])
+
+    def _build(self):
+        """
+          Retrograde breadth first search from the goal over the placements
+        of the tiles and the blank.  Sliding one of the other tiles is free,
+        so it is a 0-1 search.
+        """
+        weights = [9 ** i for i in range(len(self.tiles))]
+        distance = array.array('B', [255]) * (9 ** len(self.tiles) * 9)
+        goal = sum([tile * weight for tile, weight in zip(self.tiles, weights)])
+        distance[goal * 9] = 0
+        queue = collections.deque([(0, goal, 0)])
+        while queue:
+            d, placement, blank = queue.popleft()
+            if d > distance[placement * 9 + blank]: continue
+            occupied = dict([((placement / weight) % 9, weight) for weight in weights])
+            for next in _NEIGHBORS[blank]:
+                if next in occupied:
+                    # The tile at next slides into the blank
+                    nextPlacement, cost = placement + (blank - next) * occupied[next], 1
+                else:
+                    nextPlacement, cost = placement, 0
+                k = nextPlacement * 9 + next
+                if d + cost < distance[k]:
+                    distance[k] = d + cost
+                    if cost: queue.append((d + 1, nextPlacement, next))
+                    else: queue.appendleft((d, nextPlacement, next))
+        return distance
+
+_NEIGHBORS = [[q for q in range(9) if abs(q / 3 - p / 3) + abs(q % 3 - p % 3) == 1] for p in range(9)]
+
+def _cacheName(tiles):
+    return 'tiles-%s.pdb' % '-'.join([str(tile) for tile in tiles])
+
+HEURISTICS = {'null': search.nullHeuristic,
+              'manhattan': manhattanHeuristic,
+              'linearConflict': linearConflictHeuristic,
+              'patternDatabase': patternDatabaseHeuristic}
+
+def solvePuzzles(puzzles, heuristic=search.nullHeuristic):
+    """
+      Solves each puzzle with aStarSearch and prints the throughput.
+    Returns the list of paths.
+    """
+    paths, expanded = [], 0
+    start = time.time()
+    for puzzle in puzzles:
+        paths.append(search.aStarSearch(EightPuzzleSearchProblem(puzzle), heuristic))
+        expanded += search.lastStats.expanded
+    elapsed = max(time.time() - start, 1e-6)
+    print('Solved %d puzzles (%d moves) in %.3f seconds: %.1f puzzles/s, %d nodes expanded, %.0f nodes/s' %
+          (len(puzzles), sum([len(path) for path in paths]), elapsed,
+           len(puzzles) / elapsed, expanded, expanded / elapsed))
+    return paths
+
+def readCommand(argv):
+    "Processes the command used to run eightpuzzle from the command line"
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python eightpuzzle.py <options>
+    EXAMPLES:   (1) python eightpuzzle.py
+                    - steps through the BFS solution of a random puzzle
+                (2) python eightpuzzle.py --batch 100 --heuristic patternDatabase
+                    - solves EIGHT_PUZZLE_DATA and 100 random puzzles with A*
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-b', '--batch', type='int', dest='batch', default=None,
+                      help='Solve EIGHT_PUZZLE_DATA and this many random puzzles, then report throughput', metavar='N')
+    parser.add_option('-H', '--heuristic', dest='heuristic', default='patternDatabase',
+                      help='Heuristic for batch mode: %s [Default: %%default]' % ', '.join(sorted(HEURISTICS)))
+    parser.add_option('-s', '--seed', type='int', dest='seed', default=None,
+                      help='Random seed for the random puzzles')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if options.heuristic not in HEURISTICS:
+        raise Exception('Unknown heuristic: ' + options.heuristic)
+    return options
+
 if __name__ == '__main__':
+    import sys
+    options = readCommand(sys.argv[1:])
+    if options.seed is not None: random.seed(options.seed)
+    if options.batch is not None:
+        puzzles = [loadEightPuzzle(i) for i in range(len(EIGHT_PUZZLE_DATA))]
+        puzzles += [createRandomEightPuzzle() for i in range(options.batch)]
+        solvePuzzles(puzzles, HEURISTICS[options.heuristic])
+        sys.exit(0)
+
     puzzle = createRandomEightPuzzle(25)
     print('A random puzzle:')
     print(puzzle)
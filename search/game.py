@@ -22,6 +22,7 @@
 
 from util import *
 import time, os
+import random
 import traceback
 import sys
 
@@ -161,9 +162,16 @@ class AgentState:
 
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by a single bit-packed integer.
+    Data is accessed via grid[x][y] where (x,y) are positions on a Pacman map
+    with x horizontal, y vertical and the origin (0,0) in the bottom left
+    corner.  grid[x] is a lightweight view of column x that reads and writes
+    through to the grid.
+
+    Cell (x,y) is bit x * height + y, so copying a grid shares its (immutable)
+    integer, and equality and count() work on whole machine words.  The hash
+    is a Zobrist hash (the XOR of a fixed random key per set cell): it is
+    cached, carried over by copy() and updated in O(1) when a cell flips.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
@@ -173,57 +181,81 @@ class Grid:
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(height)] for x in range(width)]
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+        else:
+            self.bits = 0
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
+        self._hash = None
+        self._hashedBits = None # The bits _hash was computed for
 
     def __getitem__(self, i):
-        return self.data[i]
+        if i < 0: i += self.width
+        if not 0 <= i < self.width: raise IndexError('Grid column index out of range')
+        return GridColumn(self, i)
 
     def __setitem__(self, key, item):
-        self.data[key] = item
+        column = GridColumn(self, key)
+        for y, value in enumerate(item):
+            column[y] = value
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield GridColumn(self, x)
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out = [[str(self[x][y])[0] for x in range(self.width)] for y in range(self.height)]
         out.reverse()
         return '\n'.join([''.join(x) for x in out])
 
     def __eq__(self, other):
         if other == None: return False
-        return self.data == other.data
+        return self.bits == other.bits and self.height == other.height and self.width == other.width
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        if self._hashedBits is not self.bits:
+            h = 0
+            bits = self.bits
+            while bits:
+                low = bits & -bits
+                h ^= zobristKey(low.bit_length() - 1)
+                bits ^= low
+            self._hash, self._hashedBits = h, self.bits
+        return self._hash
 
     def copy(self):
         g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g.bits = self.bits
+        g._hash, g._hashedBits = self._hash, self._hashedBits
         return g
 
+    def freeze(self):
+        "Returns an immutable FrozenGrid with the same cells"
+        return FrozenGrid(self)
+
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
-        g.data = self.data
-        return g
+        return self.copy()
 
     def count(self, item =True ):
-        return sum([x.count(item) for x in self.data])
+        ones = bin(self.bits).count('1')
+        if item: return ones
+        return self.width * self.height - ones
 
     def asList(self, key = True):
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key: list.append( (x,y) )
+        bits = self.bits
+        if not key: bits ^= (1 << (self.width * self.height)) - 1
+        while bits:
+            low = bits & -bits
+            list.append(self._cellIndexToPosition(low.bit_length() - 1))
+            bits ^= low
         return list
 
     def packBits(self):
@@ -236,8 +268,7 @@ class Grid:
         currentInt = 0
         for i in range(self.height * self.width):
             bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
+            if (self.bits >> i) & 1:
                 currentInt += 2 ** bit
             if (i + 1) % self.CELLS_PER_INT == 0:
                 bits.append(currentInt)
@@ -245,6 +276,16 @@ class Grid:
         bits.append(currentInt)
         return tuple(bits)
 
+    def _setCell(self, index, value):
+        "Sets bit index, keeping a cached hash up to date"
+        mask = 1 << index
+        if bool(self.bits & mask) == value: return
+        hashValid = self._hashedBits is self.bits
+        self.bits ^= mask
+        if hashValid:
+            self._hash ^= zobristKey(index)
+            self._hashedBits = self.bits
+
     def _cellIndexToPosition(self, index):
         x = index / self.height
         y = index % self.height
@@ -258,8 +299,8 @@ class Grid:
         for packed in bits:
             for bit in self._unpackInt(packed, self.CELLS_PER_INT):
                 if cell == self.width * self.height: break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
+                if bit: self.bits |= 1 << cell
+                else: self.bits &= ~(1 << cell)
                 cell += 1
 
     def _unpackInt(self, packed, size):
@@ -274,6 +315,74 @@ class Grid:
                 bools.append(False)
         return bools
 
+class GridColumn(object):
+    """
+    A view of one column of a Grid, so that grid[x][y] reads and
+    grid[x][y] = value writes the grid's bits.
+    """
+    __slots__ = ('grid', 'offset', 'height')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.height = grid.height
+        self.offset = x * grid.height
+
+    def __getitem__(self, y):
+        if y < 0: y += self.height
+        if not 0 <= y < self.height: raise IndexError('Grid row index out of range')
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        if y < 0: y += self.height
+        if not 0 <= y < self.height: raise IndexError('Grid row index out of range')
+        if value not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.grid._setCell(self.offset + y, value)
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        bits = self.grid.bits >> self.offset
+        for y in range(self.height):
+            yield (bits >> y) & 1 == 1
+
+class FrozenGrid(Grid):
+    """
+    An immutable Grid.  Its hash is computed at most once, and withCell
+    derives a grid with one cell changed by updating the hash with a single
+    XOR.  A FrozenGrid is equal to, and hashes like, a Grid with the same
+    cells; copy() returns a mutable Grid.
+    """
+    def __init__(self, grid):
+        Grid.__init__(self, grid.width, grid.height)
+        self.bits = grid.bits
+        self._hash, self._hashedBits = grid._hash, grid._hashedBits
+
+    def freeze(self):
+        return self
+
+    def withCell(self, x, y, value):
+        "Returns a FrozenGrid equal to this one except that cell (x,y) is value"
+        index = x * self.height + y
+        if bool((self.bits >> index) & 1) == value: return self
+        hash(self)
+        g = FrozenGrid(self)
+        g.bits = self.bits ^ (1 << index)
+        g._hash, g._hashedBits = self._hash ^ zobristKey(index), g.bits
+        return g
+
+    def _setCell(self, index, value):
+        raise Exception('FrozenGrid cannot be modified; use withCell or copy')
+
+_zobristKeys = []
+_zobristRandom = random.Random(188) # Private generator, so game randomness is unaffected
+
+def zobristKey(index):
+    "Returns the fixed random key that Grid hashes use for cell index"
+    while index >= len(_zobristKeys):
+        _zobristKeys.append(_zobristRandom.getrandbits(62))
+    return _zobristKeys[index]
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -368,22 +477,85 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
-class GameStateData:
+class Adjacency:
+    """
+    The legal moves out of every cell of a walls Grid, computed once per
+    layout.  Cells are numbered as in Grid (x * height + y).  For each open
+    cell, moves[cell] is a tuple of (nextPosition, action) pairs in NORTH,
+    SOUTH, EAST, WEST order, neighbors[cell] holds the matching cell numbers
+    and legalMask[cell] has bit k set when ACTIONS[k] is legal.  Walls have
+    no moves.
+
+    Use getAdjacency(walls) to share one index among all search problems on
+    the same layout.
     """
+    ACTIONS = (Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST)
+
+    def __init__(self, walls):
+        self.width, self.height = walls.width, walls.height
+        numCells = self.width * self.height
+        self.moves = [()] * numCells
+        self.neighbors = [()] * numCells
+        self.legalMask = [0] * numCells
+        for x, y in walls.asList(False):
+            moves, neighbors, mask = [], [], 0
+            for k, action in enumerate(self.ACTIONS):
+                dx, dy = Actions._directions[action]
+                nextx, nexty = x + dx, y + dy
+                if not walls[nextx][nexty]:
+                    moves.append(((nextx, nexty), action))
+                    neighbors.append(nextx * self.height + nexty)
+                    mask |= 1 << k
+            cell = x * self.height + y
+            self.moves[cell] = tuple(moves)
+            self.neighbors[cell] = tuple(neighbors)
+            self.legalMask[cell] = mask
+
+    def cellIndex(self, position):
+        x, y = position
+        return x * self.height + y
+
+    def movesFrom(self, position):
+        "Returns the (nextPosition, action) pairs that are legal from position"
+        x, y = position
+        return self.moves[x * self.height + y]
+
+    def isLegal(self, position, action):
+        x, y = position
+        return bool(self.legalMask[x * self.height + y] & (1 << self.ACTIONS.index(action)))
 
+_adjacencies = {} # (width, height, wall bits) -> Adjacency
+
+def getAdjacency(walls):
+    "Returns the shared Adjacency index for a walls Grid"
+    key = (walls.width, walls.height, walls.bits)
+    if key not in _adjacencies:
+        _adjacencies[key] = Adjacency(walls)
+    return _adjacencies[key]
+
+class GameStateData:
+    """
+    The data of a game state.  A new state shares its food, capsules and
+    tuple of agent states with the state it was made from; the game rules
+    replace (rather than change) whichever of them a move affects, and an
+    agent state is copied the first time a state changes it (see
+    writableAgentState).
     """
     def __init__( self, prevState = None ):
         """
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            self.food = prevState.food
+            self.capsules = prevState.capsules
+            self.agentStates = prevState.agentStates
+            prevState._ownedAgents = 0 # Its agent states are now shared too
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
 
+        self._ownedAgents = 0 # Bit i is set once agentStates[i] is this state's own copy
+
         self._foodEaten = None
         self._foodAdded = None
         self._capsuleEaten = None
@@ -395,7 +567,6 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
@@ -408,6 +579,18 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def writableAgentState( self, index ):
+        """
+        Returns agentStates[index] to be changed, copying it first unless this
+        state already has a copy of its own.
+        """
+        if not self._ownedAgents >> index & 1:
+            agentStates = list( self.agentStates )
+            agentStates[index] = agentStates[index].copy()
+            self.agentStates = tuple( agentStates )
+            self._ownedAgents |= 1 << index
+        return self.agentStates[index]
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -424,17 +607,15 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError, e:
-                print e
-                #hash(state)
         return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
 
+    def freeze( self ):
+        "Returns an immutable copy of this state whose hash is computed once"
+        return FrozenGameStateData( self )
+
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[None] * height for x in range(width)]
         if type(self.food) == type((1,2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -455,7 +636,9 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        out = [''.join([map[x][y] for x in range(width)]) for y in range(height)]
+        out.reverse()
+        return '\n'.join(out) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr( self, hasFood, hasWall ):
         if hasFood:
@@ -495,15 +678,42 @@ class GameStateData:
         self.score = 0
         self.scoreChange = 0
 
-        self.agentStates = []
+        agentStates = []
         numGhosts = 0
         for isPacman, pos in layout.agentPositions:
             if not isPacman:
                 if numGhosts == numGhostAgents: continue # Max ghosts reached already
                 else: numGhosts += 1
-            self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
+            agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
+        self.agentStates = tuple( agentStates )
+        self._ownedAgents = 0
         self._eaten = [False for a in self.agentStates]
 
+class FrozenGameStateData( GameStateData ):
+    """
+    A GameStateData that is not modified after construction, so its hash is
+    computed once, when it is frozen.  Its food is a FrozenGrid.  It is equal
+    to, and hashes like, the mutable state it was frozen from; deepCopy()
+    returns a mutable GameStateData.
+    """
+    def __init__( self, prevState ):
+        GameStateData.__init__( self, prevState )
+        self.food = prevState.food.freeze()
+        self._foodEaten = prevState._foodEaten
+        self._foodAdded = prevState._foodAdded
+        self._capsuleEaten = prevState._capsuleEaten
+        self._agentMoved = prevState._agentMoved
+        self._lose = prevState._lose
+        self._win = prevState._win
+        self.scoreChange = prevState.scoreChange
+        self._hash = GameStateData.__hash__( self )
+
+    def __hash__( self ):
+        return self._hash
+
+    def freeze( self ):
+        return self
+
 try:
     import boinc
     _BOINC_ENABLED = True
@@ -527,6 +737,8 @@ class Game:
         self.moveHistory = []
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
+        self.moveLatencies = [LatencyHistogram() for agent in agents]
+        self.moveTimer = MoveTimer()
         self.agentTimeout = False
         import cStringIO
         self.agentOutput = [cStringIO.StringIO() for agent in agents]
@@ -566,8 +778,17 @@ class Game:
 
     def run( self ):
         """
-        Main control loop for game play.
+        Main control loop for game play.  With catchExceptions, agent calls
+        get deadlines from one MoveTimer for the whole game; either way the
+        time each agent takes per move is counted in moveLatencies.
         """
+        if self.catchExceptions: self.moveTimer.start()
+        try:
+            self._run()
+        finally:
+            self.moveTimer.stop()
+
+    def _run( self ):
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
@@ -587,12 +808,9 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
                         try:
-                            start_time = time.time()
-                            timed_func(self.state.deepCopy())
-                            time_taken = time.time() - start_time
-                            self.totalAgentTimes[i] += time_taken
+                            self.moveTimer.call(self.rules.getMaxStartupTime(i), agent.registerInitialState, self.state.deepCopy())
+                            self.totalAgentTimes[i] += self.moveTimer.elapsed
                         except TimeoutFunctionException:
                             print >>sys.stderr, "Agent %d ran out of time on startup!" % i
                             self.unmute()
@@ -621,20 +839,20 @@ class Game:
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
                         try:
-                            start_time = time.time()
-                            observation = timed_func(self.state.deepCopy())
+                            observation = self.moveTimer.call(self.rules.getMoveTimeout(agentIndex), agent.observationFunction, self.state.deepCopy())
                         except TimeoutFunctionException:
                             skip_action = True
-                        move_time += time.time() - start_time
+                        move_time += self.moveTimer.elapsed
                         self.unmute()
                     except Exception,data:
                         self._agentCrash(agentIndex, quiet=False)
                         self.unmute()
                         return
                 else:
+                    start_time = time.time()
                     observation = agent.observationFunction(self.state.deepCopy())
+                    move_time += time.time() - start_time
                 self.unmute()
             else:
                 observation = self.state.deepCopy()
@@ -644,12 +862,10 @@ class Game:
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
                     try:
-                        start_time = time.time()
                         if skip_action:
                             raise TimeoutFunctionException()
-                        action = timed_func( observation )
+                        action = self.moveTimer.call(self.rules.getMoveTimeout(agentIndex) - move_time, agent.getAction, observation)
                     except TimeoutFunctionException:
                         print >>sys.stderr, "Agent %d timed out on a single move!" % agentIndex
                         self.agentTimeout = True
@@ -657,7 +873,8 @@ class Game:
                         self.unmute()
                         return
 
-                    move_time += time.time() - start_time
+                    move_time += self.moveTimer.elapsed
+                    self.moveLatencies[agentIndex].add(move_time)
 
                     if move_time > self.rules.getMoveWarningTime(agentIndex):
                         self.totalAgentTimeWarnings[agentIndex] += 1
@@ -683,7 +900,9 @@ class Game:
                     self.unmute()
                     return
             else:
+                start_time = time.time()
                 action = agent.getAction(observation)
+                self.moveLatencies[agentIndex].add(move_time + time.time() - start_time)
             self.unmute()
 
             # Execute the action
@@ -22,6 +22,10 @@ VISIBILITY_MATRIX_CACHE = {}
 class Layout:
     """
     A Layout manages the static information about the game board.
+
+    Layouts are not changed once built (walls and food are FrozenGrids), so
+    game states share them: deepCopy returns the layout itself, and
+    getLayout parses each layout text only once (see internLayout).
     """
 
     def __init__(self, layoutText):
@@ -33,6 +37,8 @@ class Layout:
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
+        self.walls = self.walls.freeze()
+        self.food = self.food.freeze()
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
         # self.initializeVisibilityMatrix()
@@ -46,7 +52,8 @@ class Layout:
             from game import Directions
             vecs = [(-0.5,0), (0.5,0),(0,-0.5),(0,0.5)]
             dirs = [Directions.NORTH, Directions.SOUTH, Directions.WEST, Directions.EAST]
-            vis = Grid(self.width, self.height, {Directions.NORTH:set(), Directions.SOUTH:set(), Directions.EAST:set(), Directions.WEST:set(), Directions.STOP:set()})
+            # Grids only hold booleans, so the per-cell sets go in a list of lists
+            vis = [[dict((d, set()) for d in dirs + [Directions.STOP]) for y in range(self.height)] for x in range(self.width)]
             for x in range(self.width):
                 for y in range(self.height):
                     if self.walls[x][y] == False:
@@ -55,7 +62,7 @@ class Layout:
                             nextx, nexty = x + dx, y + dy
                             while (nextx + nexty) != int(nextx) + int(nexty) or not self.walls[int(nextx)][int(nexty)] :
                                 vis[x][y][direction].add((nextx, nexty))
-                                nextx, nexty = x + dx, y + dy
+                                nextx, nexty = nextx + dx, nexty + dy
             self.visibility = vis
             VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
         else:
@@ -90,7 +97,7 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        return self
 
     def processLayoutText(self, layoutText):
         """
@@ -145,5 +152,14 @@ def getLayout(name, back = 2):
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)): return None
     f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    try: return internLayout([line.strip() for line in f])
     finally: f.close()
+
+_layouts = {} # tuple of layout lines -> Layout
+
+def internLayout(layoutText):
+    "Returns the shared Layout for a list of layout lines, parsing them the first time only"
+    key = tuple(layoutText)
+    if key not in _layouts:
+        _layouts[key] = Layout(list(layoutText))
+    return _layouts[key]
@@ -0,0 +1,161 @@
+# mazeDistances.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Precomputed all-pairs maze distances for a layout.
+
+getMazeDistances(walls) runs one breadth first search from every open cell
+of a walls Grid and stores the results as an unsigned 16-bit integer per
+pair of open cells.  Tables are cached in memory by a digest of the walls,
+and written to CACHE_DIR so that later runs on the same layout load the
+file instead of searching again:
+
+> distances = getMazeDistances(gameState.getWalls())
+> distances.distance((1,1), (5,3))
+> distances.nearest((1,1), food.asList())
+"""
+
+import array
+import collections
+import hashlib
+import os
+import sys
+import tempfile
+import util
+
+# Directory for the on-disk cache (None disables it)
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'pacman-maze-distances')
+
+UNREACHABLE = 0xFFFF
+
+_tables = {} # walls digest -> MazeDistances
+
+def getMazeDistances(walls):
+    """
+    Returns the MazeDistances for a walls Grid (layout.walls or
+    gameState.getWalls()), from the memory cache, the disk cache or by
+    searching from every open cell, in that order.
+    """
+    key = wallsDigest(walls)
+    if key not in _tables:
+        numCells = walls.width * walls.height - walls.count()
+        table = util.loadCachedTable(CACHE_DIR, key + '.u16', 2 * numCells * numCells)
+        if table is None:
+            distances = MazeDistances(walls)
+            _saveTable(key, distances)
+        else:
+            distances = MazeDistances(walls, table)
+        _tables[key] = distances
+    return _tables[key]
+
+def wallsDigest(walls):
+    "Returns a hex digest identifying the shape and walls of a Grid"
+    return hashlib.md5('%d,%d,%x' % (walls.width, walls.height, walls.bits)).hexdigest()
+
+class MazeDistances:
+    """
+    The maze distance between every pair of open cells of a layout.  Open
+    cells are numbered in Grid.asList order, and the distance from cell i to
+    cell j is entry i * numCells + j of the table, or UNREACHABLE.
+    """
+    def __init__(self, walls, table=None):
+        self.cells = walls.asList(False)
+        self.cellIndex = dict([(cell, i) for i, cell in enumerate(self.cells)])
+        self.numCells = len(self.cells)
+        if self.numCells >= UNREACHABLE:
+            raise Exception('Too many open cells for 16-bit maze distances: %d' % self.numCells)
+        if table is None:
+            table = self._search(walls)
+        elif not isinstance(table, array.array):
+            # Copy a little-endian file buffer into an array, whose lookups are
+            # several times faster than unpacking the buffer entry by entry
+            buffer, table = table, array.array('H')
+            table.fromstring(buffer[:])
+            if sys.byteorder != 'little': table.byteswap()
+        self.table = table
+        self._entry = table.__getitem__
+
+    def distance(self, a, b):
+        """
+        Returns the length of a shortest path between positions a and b, or
+        None if there is none.  Both must be open cells.
+        """
+        d = self._entry(self.cellIndex[a] * self.numCells + self.cellIndex[b])
+        if d == UNREACHABLE: return None
+        return d
+
+    def nearest(self, a, targets):
+        """
+        Returns (distance, target) for the target position closest to a, or
+        (None, None) if none of the targets can be reached.  Ties go to the
+        target listed first.
+        """
+        base = self.cellIndex[a] * self.numCells
+        cellIndex, entry = self.cellIndex, self._entry
+        best, bestTarget = UNREACHABLE, None
+        for target in targets:
+            d = entry(base + cellIndex[target])
+            if d < best:
+                best, bestTarget = d, target
+        if bestTarget is None: return None, None
+        return best, bestTarget
+
+    def spanningTree(self, points):
+        """
+        Returns the total length of a minimum spanning tree over points, with
+        maze distances as edge lengths (Prim's algorithm).
+        """
+        if not points: return 0
+        n, entry, cellIndex = self.numCells, self._entry, self.cellIndex
+        indices = [cellIndex[point] for point in points]
+        base = indices[0] * n
+        best = dict([(i, entry(base + i)) for i in indices[1:]])
+        total = 0
+        while best:
+            i = min(best, key=best.get)
+            total += best.pop(i)
+            base = i * n
+            for j in best:
+                d = entry(base + j)
+                if d < best[j]: best[j] = d
+        return total
+
+    def _search(self, walls):
+        "Runs a breadth first search from every open cell"
+        n = self.numCells
+        neighbors = []
+        for x, y in self.cells:
+            adjacent = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+            neighbors.append([self.cellIndex[c] for c in adjacent if c in self.cellIndex])
+        table = array.array('H', [UNREACHABLE]) * (n * n)
+        for source in range(n):
+            base = source * n
+            table[base + source] = 0
+            queue = collections.deque([source])
+            while queue:
+                i = queue.popleft()
+                d = table[base + i] + 1
+                for j in neighbors[i]:
+                    if table[base + j] == UNREACHABLE:
+                        table[base + j] = d
+                        queue.append(j)
+        return table
+
+def _saveTable(key, distances):
+    "Writes a table to the disk cache, little-endian"
+    table = distances.table
+    if sys.byteorder != 'little':
+        table = array.array('H', table)
+        table.byteswap()
+    util.saveCachedTable(CACHE_DIR, key + '.u16', table)
@@ -43,10 +43,11 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import Configuration
 from util import nearestPoint
 from util import manhattanDistance
 import util, layout
-import sys, types, time, random, os
+import sys, types, time, random, os, inspect
 
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
@@ -71,14 +72,29 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
+    # static variable keeps track of the states generateSuccessor was called
+    # on or returned, when turned on with trackExplored (graders do)
     explored = set()
+    exploredTracker = None
+
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
+        tmp = GameState.explored
         GameState.explored = set()
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
+    def trackExplored(sampleRate=1.0, maxSize=None):
+        """
+        Turns recording into GameState.explored on, or off with sampleRate 0.
+        Only a sampleRate fraction of generateSuccessor calls are recorded,
+        and none once explored holds maxSize states.
+        """
+        if sampleRate > 0:
+            GameState.exploredTracker = ExploredTracker(sampleRate, maxSize)
+        else:
+            GameState.exploredTracker = None
+    trackExplored = staticmethod(trackExplored)
+
     def getLegalActions( self, agentIndex=0 ):
         """
         Returns the legal actions for the agent specified.
@@ -112,7 +128,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
         else:
-            GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+            GhostRules.decrementTimer( state.data.writableAgentState( agentIndex ) )
 
         # Resolve multi-agent effects
         GhostRules.checkDeath( state, agentIndex )
@@ -120,8 +136,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.exploredTracker != None:
+            GameState.exploredTracker.record(self, state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -146,7 +162,7 @@ class GameState:
         return self.data.agentStates[0].getPosition()
 
     def getGhostStates( self ):
-        return self.data.agentStates[1:]
+        return list( self.data.agentStates[1:] )
 
     def getGhostState( self, agentIndex ):
         if agentIndex == 0 or agentIndex >= self.getNumAgents():
@@ -231,6 +247,16 @@ class GameState:
         state.data = self.data.deepCopy()
         return state
 
+    def freeze( self ):
+        """
+        Returns an immutable copy of this state, which is equal to it but
+        computes its hash only once.  Successors of a frozen state are
+        ordinary mutable states.
+        """
+        state = GameState( self )
+        state.data = self.data.freeze()
+        return state
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -253,6 +279,26 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+class ExploredTracker:
+    """
+    Adds states to GameState.explored for a sampleRate fraction of the
+    generateSuccessor calls, spread evenly (so game randomness is not
+    touched), until it holds maxSize states.
+    """
+    def __init__( self, sampleRate=1.0, maxSize=None ):
+        self.sampleRate = min(sampleRate, 1.0)
+        self.maxSize = maxSize
+        self.credit = 0.0
+
+    def record( self, parent, child ):
+        self.credit += self.sampleRate
+        if self.credit < 1.0: return
+        self.credit -= 1.0
+        explored = GameState.explored
+        if self.maxSize != None and len(explored) >= self.maxSize: return
+        explored.add(parent)
+        explored.add(child)
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -342,7 +388,7 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.writableAgentState( 0 )
 
         # Update Configuration
         vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
@@ -371,11 +417,11 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if( position in state.getCapsules() ):
-            state.data.capsules.remove( position )
+            state.data.capsules = [capsule for capsule in state.data.capsules if capsule != position]
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.writableAgentState( index ).scaredTimer = SCARED_TIME
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -404,7 +450,7 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.writableAgentState( ghostIndex )
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
         vector = Actions.directionToVector( action, speed )
@@ -414,7 +460,8 @@ class GhostRules:
     def decrementTimer( ghostState):
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint( ghostState.configuration.pos )
+            conf = ghostState.configuration
+            ghostState.configuration = Configuration( nearestPoint( conf.pos ), conf.direction )
         ghostState.scaredTimer = max( 0, timer - 1 )
     decrementTimer = staticmethod( decrementTimer )
 
@@ -436,9 +483,11 @@ class GhostRules:
     def collide( state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
+            ghostState = state.data.writableAgentState( agentIndex )
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
             # Added for first-person
+            state.data._eaten = state.data._eaten[:]
             state.data._eaten[agentIndex] = True
         else:
             if not state.data._win:
@@ -473,6 +522,11 @@ def parseAgentArgs(str):
         opts[key] = val
     return opts
 
+def takesArgument(agentType, name):
+    "Returns whether the constructor of an agent class has an argument called name"
+    init = getattr(agentType, '__init__', None)
+    return inspect.ismethod(init) and name in inspect.getargspec(init)[0]
+
 def readCommand( argv ):
     """
     Processes the command used to run pacman from the command line.
@@ -523,6 +577,8 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('-w', '--workers', dest='workers', type='int',
+                      help=default('Number of worker processes to play the games in, without graphics (0 plays them here)'), default=0)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -543,6 +599,8 @@ def readCommand( argv ):
     if options.numTraining > 0:
         args['numTraining'] = options.numTraining
         if 'numTraining' not in agentOpts: agentOpts['numTraining'] = options.numTraining
+    if 'startupTime' not in agentOpts and takesArgument(pacmanType, 'startupTime'):
+        agentOpts['startupTime'] = options.timeout
     pacman = pacmanType(**agentOpts) # Instantiate Pacman with agentArgs
     args['pacman'] = pacman
 
@@ -570,6 +628,7 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['workers'] = options.workers
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -625,7 +684,17 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, workers=0 ):
+    """
+    Plays numGames games and prints a summary of the ones that were not for
+    training.  With workers > 0 the games are played in that many worker
+    processes instead (see runGamesInParallel), and GameResults are returned
+    in place of Games.
+    """
+    if workers > 0:
+        if numTraining > 0: raise Exception('Training games cannot be played in worker processes')
+        return runGamesInParallel(layout, pacman, ghosts, numGames, record, workers, catchExceptions, timeout)
+
     import __main__
     __main__.__dict__['_display'] = display
 
@@ -647,24 +716,88 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         if not beQuiet: games.append(game)
 
         if record:
-            import time, cPickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            cPickle.dump(components, f)
-            f.close()
+            recordGame(layout, game.moveHistory, i)
 
     if (numGames-numTraining) > 0:
-        scores = [game.state.getScore() for game in games]
-        wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        print 'Average Score:', sum(scores) / float(len(scores))
-        print 'Scores:       ', ', '.join([str(score) for score in scores])
-        print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
-        print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+        printSummary([game.state.getScore() for game in games], [game.state.isWin() for game in games])
 
     return games
 
+def recordGame( layout, moveHistory, i ):
+    "Writes the history of the i-th game to a file named by the time it is written"
+    import time, cPickle
+    fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+    f = file(fname, 'w')
+    components = {'layout': layout, 'actions': moveHistory}
+    cPickle.dump(components, f)
+    f.close()
+
+def printSummary( scores, wins ):
+    winRate = wins.count(True)/ float(len(wins))
+    print 'Average Score:', sum(scores) / float(len(scores))
+    print 'Scores:       ', ', '.join([str(score) for score in scores])
+    print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
+    print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+
+class GameResult:
+    """
+    What a worker process sends back about one game: its index, score,
+    whether Pacman won and its move history.
+    """
+    def __init__( self, index, score, win, moveHistory ):
+        self.index = index
+        self.score = score
+        self.win = win
+        self.moveHistory = moveHistory
+
+_workerGame = None # (layout, pacman, ghosts, rules, catchExceptions), inherited by the workers
+
+def runGamesInParallel( layout, pacman, ghosts, numGames, record, workers, catchExceptions=False, timeout=30 ):
+    """
+    Plays numGames games in a pool of worker processes, without graphics.
+    The workers are forked from this process, so they start with their own
+    copies of the agents and layout.  Game i is played after seeding random
+    with the i-th seed drawn from a master seed, which is itself drawn from
+    random, so a fixed random seed (-f) replays the same games whatever the
+    number of workers.
+
+    Results stream back as games finish (and are recorded then, if asked);
+    the summary lists them in game order, as runGames does.  Returns the
+    GameResults in game order.
+    """
+    import multiprocessing
+    global _workerGame
+    seeder = random.Random(random.getrandbits(32))
+    tasks = [(i, seeder.getrandbits(32)) for i in range(numGames)]
+    rules = ClassicGameRules(timeout)
+    _workerGame = (layout, pacman, ghosts, rules, catchExceptions)
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = []
+        for result in pool.imap_unordered(_playGame, tasks):
+            if record: recordGame(layout, result.moveHistory, result.index)
+            results.append(result)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        _workerGame = None
+    results.sort(key=lambda result: result.index)
+
+    if numGames > 0:
+        printSummary([result.score for result in results], [result.win for result in results])
+    return results
+
+def _playGame( task ):
+    "Plays one game in a worker process"
+    import textDisplay
+    index, seed = task
+    layout, pacman, ghosts, rules, catchExceptions = _workerGame
+    random.seed(seed)
+    game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), False, catchExceptions)
+    game.run()
+    return GameResult(index, game.state.getScore(), game.state.isWin(), game.moveHistory)
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
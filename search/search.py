@@ -18,6 +18,13 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+import time
+import copy
+import heapq
+import itertools
+from game import Actions
+from game import Directions
+from game import getAdjacency
 
 class SearchProblem:
     """
@@ -80,67 +87,19 @@ def depthFirstSearch(problem):
     print("Start's successors:", problem.getSuccessors(problem.getStartState()))
     """
     "*** YOUR CODE HERE ***"
-    print("Start:", problem.getStartState())
-    stack = util.Stack()
-    visited = []
-    startNode = (problem.getStartState(), [], 0)
-    stack.push(startNode)
-    while not stack.isEmpty():
-        curNode, path, cost = stack.pop()
-        if curNode in visited:
-            continue
-        visited.append(curNode)
-        if problem.isGoalState(curNode):
-            return path
-        for n, p, c in problem.getSuccessors(curNode):
-            if n not in visited:
-                stack.push((n, path + [p], cost + c))
-
-
-
-
+    return graphSearch(problem, util.Stack(), SearchStats('depthFirstSearch'))
 
 def breadthFirstSearch(problem):
     """Search the shallowest nodes in the search tree first."""
     "*** YOUR CODE HERE ***"
-    queue = util.Queue()
-    visited = []
-    startNode = (problem.getStartState(), [], 0)
-    queue.push(startNode)
-    while not queue.isEmpty():
-        curNode, path, cost = queue.pop()
-        if curNode in visited:
-            continue
-        visited.append(curNode)
-        if problem.isGoalState(curNode):
-            return path
-        for n, p, c, in problem.getSuccessors(curNode):
-            if n not in visited:
-                queue.push((n, path + [p], cost + c))
-
+    return graphSearch(problem, util.Queue(), SearchStats('breadthFirstSearch'))
 
 def uniformCostSearch(problem):
     """Search the node of least total cost first."""
     "*** YOUR CODE HERE ***"
-    queue = util.PriorityQueue()
-    visited = []
-    startNode = (problem.getStartState(), [], 0)
-    queue.push(startNode, problem)
-    while not queue.isEmpty():
-        curNode, path, cost = queue.pop()
-        if curNode in visited:
-            continue
-        visited.append(curNode)
-        if problem.isGoalState(curNode):
-            return path
-        
-        for n, p, c, in problem.getSuccessors(curNode):
-            # The items in the priority queue are ordered by their cost(start to node)
-            cost = problem.getCostOfActions(path + [p])
-            if n not in visited:
-                queue.push((n, path + [p], cost + c), cost)
-
-    util.raiseNotDefined()
+    # The items in the priority queue are ordered by their cost (start to node)
+    priority = nodeCost(problem)
+    return graphSearch(problem, priorityFrontier(priority), SearchStats('uniformCostSearch'))
 
 def nullHeuristic(state, problem=None):
     """
@@ -152,32 +111,727 @@ def nullHeuristic(state, problem=None):
 def aStarSearch(problem, heuristic=nullHeuristic):
     """Search the node that has the lowest combined cost and heuristic first."""
     "*** YOUR CODE HERE ***"
-    queue = util.PriorityQueue()
-    visited = []
-    startNode = (problem.getStartState(), [], 0)
-    queue.push(startNode, problem)
-    while not queue.isEmpty():
-        curNode, path, cost = queue.pop()
-        if curNode in visited:
+    # The items in the queue are ordered by cost (start to node) + heuristic (node to goal)
+    stats = SearchStats('aStarSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    cost = nodeCost(problem)
+    priority = lambda node: cost(node) + heuristic(node[0], problem)
+    return graphSearch(problem, priorityFrontier(priority), stats)
+
+def weightedAStarSearch(problem, heuristic=nullHeuristic, weight=2):
+    """
+    A* ordered by g + weight * h.  With a consistent heuristic the path costs
+    at most weight times the optimal cost, and the search usually expands far
+    fewer nodes than A*.
+    """
+    stats = SearchStats('weightedAStarSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    cost = nodeCost(problem)
+    priority = lambda node: cost(node) + weight * heuristic(node[0], problem)
+    return graphSearch(problem, priorityFrontier(priority), stats)
+
+# Seconds ARA* keeps improving its path by default
+ARA_DEADLINE = 10
+
+# Weight ARA* falls back to when the deadline passes before it has any path
+ARA_FALLBACK_WEIGHT = 1000
+
+def anytimeRepairingAStarSearch(problem, heuristic=nullHeuristic, weight=3, deadline=ARA_DEADLINE, weightStep=0.5):
+    """
+    Anytime repairing A* (ARA*): a weighted A* search with weight that is
+    repeated with the weight lowered by weightStep each time, down to 1,
+    until deadline seconds have passed.  Each repetition reuses the costs
+    found so far and only re-expands the states whose cost improved, and
+    each path found is at least as cheap as the last.  Returns the best path
+    found by the deadline; if there is none yet by then, the weight is
+    raised to ARA_FALLBACK_WEIGHT, which is nearly greedy, to find one fast.
+
+    With a consistent heuristic, the path returned costs at most
+    stats.notes['bound'] times the optimal cost; the bound is 1 once the
+    search with weight 1 finishes.  A search the deadline cuts short only
+    bounds the cost by the least g + h of its unfinished states, whatever
+    its weight.
+    """
+    stats = SearchStats('anytimeRepairingAStarSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    stopTime = time.time() + deadline
+    infinity = float('inf')
+    start = problem.getStartState()
+    if problem.isGoalState(start):
+        stats.finish()
+        return []
+    g, parents, hValues = {start: 0}, {start: None}, {}
+    def h(state):
+        if state not in hValues: hValues[state] = heuristic(state, problem)
+        return hValues[state]
+    goal, goalCost = None, infinity
+    epsilon = max(1, weight)
+    frontier = util.IndexedPriorityQueue()
+    frontier.push(start, epsilon * h(start))
+    inconsistent = set() # Expanded states whose cost improved in this search
+    iterations = 0
+    while True:
+        iterations += 1
+        closed = set()
+        cutOff = False
+        while not frontier.isEmpty() and frontier.peekPriority() < goalCost:
+            if time.time() > stopTime:
+                if goal is not None:
+                    cutOff = True
+                    break
+                if epsilon < ARA_FALLBACK_WEIGHT:
+                    # No path yet: settle for any path, found almost greedily
+                    epsilon, waiting = ARA_FALLBACK_WEIGHT, frontier.items()
+                    frontier = util.IndexedPriorityQueue()
+                    for state in waiting:
+                        frontier.push(state, g[state] + epsilon * h(state))
+            state = frontier.pop()
+            closed.add(state)
+            for nextState, action, stepCost in stats.successors(problem, state):
+                cost = g[state] + stepCost
+                if cost >= g.get(nextState, infinity): continue
+                g[nextState] = cost
+                parents[nextState] = (state, action)
+                if problem.isGoalState(nextState):
+                    if cost < goalCost: goal, goalCost = nextState, cost
+                elif nextState in closed:
+                    inconsistent.add(nextState)
+                else:
+                    frontier.push(nextState, cost + epsilon * h(nextState))
+            stats.frontierSize(len(frontier))
+        stats.closedSize(len(g))
+        if goal is None: break # No goal is reachable
+
+        # The path is within goalCost / (least g + h of any unfinished state) of optimal
+        unfinished = frontier.items() + list(inconsistent)
+        if unfinished:
+            bound = goalCost / float(min([g[s] + h(s) for s in unfinished]))
+            if not cutOff: bound = min(epsilon, bound)
+        else:
+            bound = 1
+        stats.notes['bound'] = max(1, bound)
+        if epsilon == 1 or bound <= 1 or time.time() > stopTime: break
+        epsilon = max(1, epsilon - weightStep)
+        frontier = util.IndexedPriorityQueue()
+        for state in unfinished:
+            frontier.push(state, g[state] + epsilon * h(state))
+        inconsistent = set()
+    stats.notes['iterations'] = iterations
+    stats.finish()
+    if goal is None: return None
+    path, state = [], goal
+    while parents[state] is not None:
+        state, action = parents[state]
+        path.append(action)
+    path.reverse()
+    return path
+
+def beamSearch(problem, heuristic=nullHeuristic, beamWidth=100):
+    """
+    Breadth first search that only keeps the beamWidth states with the lowest
+    g + h at each depth, so each depth costs a bounded amount of time and
+    memory.  Returns the cheapest path found at the first depth that reaches
+    a goal, or None if the beam dies out first: the path need not be optimal,
+    and a goal may be missed.
+    """
+    stats = SearchStats('beamSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    beamWidth = int(beamWidth)
+    start = problem.getStartState()
+    layer = [(start, None, None, 0)]
+    reached = set([start])
+    path = None
+    if problem.isGoalState(start): path = []
+    while path is None and layer:
+        candidates, order = {}, []
+        for node in layer:
+            for nextState, action, stepCost in stats.successors(problem, node[0]):
+                if nextState in reached: continue
+                child = (nextState, action, node, node[3] + stepCost)
+                if nextState not in candidates:
+                    order.append(nextState)
+                elif candidates[nextState][3] <= child[3]:
+                    continue
+                candidates[nextState] = child
+        children = [candidates[state] for state in order]
+        goals = [child for child in children if problem.isGoalState(child[0])]
+        if goals:
+            path = nodePath(min(goals, key=lambda node: node[3]))
+        layer = heapq.nsmallest(beamWidth, children, key=lambda node: node[3] + heuristic(node[0], problem))
+        reached.update([node[0] for node in layer])
+        stats.frontierSize(len(layer))
+    stats.closedSize(len(reached))
+    stats.finish()
+    return path
+
+# Cross-check every Nth carried node cost against problem.getCostOfActions
+# (0 disables the check)
+CHECK_COST_EVERY = 0
+
+def graphSearch(problem, frontier, stats=None):
+    """
+    Generic graph search shared by the algorithms above; the frontier
+    decides the expansion order.
+
+    Search nodes are (state, action, parent, cost) tuples where parent is the
+    node the state was reached from, so a node costs O(1) to create and the
+    action list is only rebuilt once, for the goal node.  The closed list is
+    a set of expanded states.  Returns None if no goal is reachable.  The
+    run's SearchStats are published as lastStats.
+    """
+    if stats is None: stats = SearchStats('graphSearch')
+    closed = set()
+    frontier.push((problem.getStartState(), None, None, 0))
+    path = None
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        state, action, parent, cost = node
+        if state in closed:
             continue
-        visited.append(curNode)
-        if problem.isGoalState(curNode):
-            return path
-        
-        for n, p, c, in problem.getSuccessors(curNode):
-            cost = problem.getCostOfActions(path + [p])
-            # Heusteric Cost - Cost from node to goal. The items in the queue are ordered by cost + heuristic(node to goal)
-            hCost = cost + heuristic(n, problem)
-            if n not in visited:
-                queue.push((n, path + [p], cost + c), heuristic)
+        closed.add(state)
+        if problem.isGoalState(state):
+            path = nodePath(node)
+            break
+        for nextState, nextAction, stepCost in stats.successors(problem, state):
+            if nextState not in closed:
+                frontier.push((nextState, nextAction, node, cost + stepCost))
+        stats.frontierSize(len(frontier))
+    stats.closedSize(len(closed))
+    stats.finish()
+    return path
+
+# The SearchStats of the most recent search
+lastStats = None
+
+class SearchStats:
+    """
+    Instrumentation for one search run.  Searches create one, route their
+    successor and heuristic calls through it and call finish(), which
+    records the wall time and publishes it as search.lastStats.  Times are
+    in seconds.
+    """
+    FIELDS = ('expanded', 'generated', 'peakFrontier', 'peakClosed',
+              'heuristicCalls', 'heuristicTime', 'successorTime', 'wallTime')
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+        self.notes = {} # Algorithm specific results, like a suboptimality bound
+        self.startTime = time.time()
+
+    def successors(self, problem, state):
+        "Returns problem.getSuccessors(state), counting and timing the call"
+        start = time.time()
+        successors = problem.getSuccessors(state)
+        self.successorTime += time.time() - start
+        self.expanded += 1
+        self.generated += len(successors)
+        return successors
+
+    def timedHeuristic(self, heuristic):
+        "Wraps heuristic so its calls are counted and timed"
+        def timed(state, problem):
+            start = time.time()
+            h = heuristic(state, problem)
+            self.heuristicTime += time.time() - start
+            self.heuristicCalls += 1
+            return h
+        return timed
+
+    def frontierSize(self, size):
+        if size > self.peakFrontier: self.peakFrontier = size
+
+    def closedSize(self, size):
+        if size > self.peakClosed: self.peakClosed = size
+
+    def finish(self):
+        global lastStats
+        self.wallTime = time.time() - self.startTime
+        lastStats = self
+
+    def asDict(self):
+        record = {'algorithm': self.algorithm}
+        for field in self.FIELDS:
+            record[field] = getattr(self, field)
+        record.update(self.notes)
+        return record
+
+    def __str__(self):
+        text = ('%s: %d expanded, %d generated, peak frontier %d, peak closed %d, '
+                '%d heuristic calls (%.3fs), successors %.3fs, wall %.3fs' %
+                (self.algorithm, self.expanded, self.generated, self.peakFrontier,
+                 self.peakClosed, self.heuristicCalls, self.heuristicTime,
+                 self.successorTime, self.wallTime))
+        for name in sorted(self.notes):
+            text += ', %s %s' % (name, self.notes[name])
+        return text
+
+def priorityFrontier(priority):
+    """
+    Returns the frontier used by the cost-ordered searches, keyed on the
+    node's state so a cheaper path to a queued state lowers its entry in
+    place rather than leaving a stale duplicate behind.  It is a bucket queue
+    while priorities are small integers and an indexed heap otherwise.
+    """
+    return util.CostPriorityQueueWithFunction(priority, lambda node: node[0])
+
+def nodeCost(problem):
+    """
+    Returns a function giving the cost from the start to a search node.  The
+    cost is carried on the node and updated with each successor's stepCost,
+    so it is O(1) per node.  When CHECK_COST_EVERY is set, every Nth node is
+    also replayed through problem.getCostOfActions and a mismatch raises.
+    """
+    if not CHECK_COST_EVERY:
+        return lambda node: node[3]
+    checked = [0]
+    def checkedCost(node):
+        checked[0] += 1
+        if checked[0] % CHECK_COST_EVERY == 0:
+            actions = nodePath(node)
+            expected = problem.getCostOfActions(actions)
+            if abs(expected - node[3]) > 1e-9 * max(1, abs(expected)):
+                raise Exception('Carried cost %s does not match getCostOfActions %s for %s' %
+                                (node[3], expected, actions))
+        return node[3]
+    return checkedCost
+
+def nodePath(node):
+    "Returns the list of actions leading from the start node to node"
+    actions = []
+    while node[2] is not None:
+        actions.append(node[1])
+        node = node[2]
+    actions.reverse()
+    return actions
+
+def bidirectionalSearch(problem):
+    """
+    Breadth first search from the start and from problem.goal at once,
+    returning a path with the fewest actions, like breadthFirstSearch.
+
+    The problem must have a single goal state, problem.goal, and actions
+    that can be undone with Actions.reverseDirection, as in the
+    PositionSearchProblem.  Each step expands a whole layer of the smaller
+    side, and the search stops at the end of the first layer that meets the
+    other side, so each side only searches about half the solution depth.
+    """
+    stats = SearchStats('bidirectionalSearch')
+    start, goal = problem.getStartState(), problem.goal
+    # Each side maps its reached states to their nodes; backward nodes hold
+    # the action leading from their state towards the goal
+    reached = [{start: (start, None, None, 0)}, {goal: (goal, None, None, 0)}]
+    layers = [[start], [goal]]
+    best = None
+    if start == goal: best = (reached[0][start], reached[1][goal])
+    while best is None and layers[0] and layers[1]:
+        side = len(layers[1]) < len(layers[0]) and 1 or 0
+        mine, other = reached[side], reached[1 - side]
+        nextLayer = []
+        for state in layers[side]:
+            node = mine[state]
+            for nextState, action, stepCost in stats.successors(problem, state):
+                if nextState in mine: continue
+                if side == 1: action = Actions.reverseDirection(action)
+                nextNode = (nextState, action, node, node[3] + 1)
+                mine[nextState] = nextNode
+                nextLayer.append(nextState)
+                if nextState in other:
+                    length = nextNode[3] + other[nextState][3]
+                    if best is None or length < best[0][3] + best[1][3]:
+                        best = side == 0 and (nextNode, other[nextState]) or (other[nextState], nextNode)
+        layers[side] = nextLayer
+        stats.frontierSize(len(layers[0]) + len(layers[1]))
+    stats.closedSize(len(reached[0]) + len(reached[1]))
+    stats.finish()
+    if best is None: return None
+    # The backward search starts at the goal without testing it; testing it
+    # now lets PositionSearchProblem draw the expanded cells, as it does
+    # when the other searches reach their goal
+    problem.isGoalState(goal)
+    return nodePath(best[0]) + backwardPath(best[1])
+
+def bidirectionalAStarSearch(problem, heuristic=nullHeuristic):
+    """
+    Front-to-end bidirectional A* for the same problems as
+    bidirectionalSearch; returns a least cost path.
+
+    The forward side estimates the cost to problem.goal with
+    heuristic(state, problem); the backward side estimates the cost to the
+    start with the heuristic of a copy of the problem whose goal is the
+    start.  Both sides are ordered by the average of the two estimates
+    (forward: g + (hF - hB) / 2, backward: g + (hB - hF) / 2), so they share
+    one stopping rule: once the two smallest keys add up to the cost of the
+    best meeting found, that path is optimal.  The heuristic must be
+    consistent.  Backward step costs come from problem.costFn(state) when
+    the problem has one, and are assumed symmetric otherwise.
+    """
+    stats = SearchStats('bidirectionalAStarSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    start, goal = problem.getStartState(), problem.goal
+    towardsStart = copy.copy(problem)
+    towardsStart.goal = start
+    potentials = {}
+    def potential(state):
+        if state not in potentials:
+            potentials[state] = (heuristic(state, problem) - heuristic(state, towardsStart)) / 2.0
+        return potentials[state]
+    costFn = getattr(problem, 'costFn', None)
+
+    keys = [lambda node: node[3] + potential(node[0]), lambda node: node[3] - potential(node[0])]
+    frontiers = [priorityFrontier(keys[0]), priorityFrontier(keys[1])]
+    reached = [{start: (start, None, None, 0)}, {goal: (goal, None, None, 0)}]
+    closed = [set(), set()]
+    lastKeys = [keys[0](reached[0][start]), keys[1](reached[1][goal])]
+    frontiers[0].push(reached[0][start])
+    frontiers[1].push(reached[1][goal])
+    best, bestCost = None, None
+    if start == goal: best, bestCost = (reached[0][start], reached[1][goal]), 0
+    while not frontiers[0].isEmpty() and not frontiers[1].isEmpty():
+        side = len(frontiers[1]) < len(frontiers[0]) and 1 or 0
+        node = frontiers[side].pop()
+        state, cost = node[0], node[3]
+        if state in closed[side]: continue
+        lastKeys[side] = keys[side](node)
+        if best is not None and lastKeys[0] + lastKeys[1] >= bestCost: break
+        closed[side].add(state)
+        mine, other = reached[side], reached[1 - side]
+        for nextState, action, stepCost in stats.successors(problem, state):
+            if nextState in closed[side]: continue
+            if side == 1:
+                action = Actions.reverseDirection(action)
+                if costFn is not None: stepCost = costFn(state)
+            nextNode = (nextState, action, node, cost + stepCost)
+            if nextState in mine and mine[nextState][3] <= nextNode[3]: continue
+            mine[nextState] = nextNode
+            frontiers[side].push(nextNode)
+            if nextState in other:
+                length = nextNode[3] + other[nextState][3]
+                if best is None or length < bestCost:
+                    best = side == 0 and (nextNode, other[nextState]) or (other[nextState], nextNode)
+                    bestCost = length
+        stats.frontierSize(len(frontiers[0]) + len(frontiers[1]))
+    stats.closedSize(len(closed[0]) + len(closed[1]))
+    stats.finish()
+    if best is None: return None
+    problem.isGoalState(goal) # For the display, as in bidirectionalSearch
+    return nodePath(best[0]) + backwardPath(best[1])
+
+# Largest number of states in the IDA* transposition table
+IDA_TABLE_SIZE = 1000000
+
+def iterativeDeepeningAStarSearch(problem, heuristic=nullHeuristic, tableSize=IDA_TABLE_SIZE):
+    """
+    IDA*: depth first searches bounded by f = g + h, raising the bound to the
+    smallest f that exceeded it until a goal is found.  Optimal with an
+    admissible heuristic and positive step costs.
+
+    Memory is the depth first stack plus a transposition table holding the
+    least g each state was reached with in the current iteration, so a state
+    reached again at no lower cost is pruned.  Once the table holds
+    tableSize states, new states are still searched but no longer recorded,
+    and are only checked against the states on their own path.
+    """
+    stats = SearchStats('iterativeDeepeningAStarSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    tableSize = int(tableSize)
+    infinity = float('inf')
+    start = problem.getStartState()
+    bound = heuristic(start, problem)
+    path = None
+    while path is None and bound < infinity:
+        table = {}
+        nextBound = infinity
+        stack = [(start, None, None, 0)]
+        while stack:
+            node = stack.pop()
+            state, action, parent, cost = node
+            if table.get(state, infinity) <= cost: continue
+            f = cost + heuristic(state, problem)
+            if f > bound:
+                nextBound = min(nextBound, f)
+                continue
+            if len(table) < tableSize or state in table:
+                table[state] = cost
+            elif onPath(state, parent):
+                continue
+            if problem.isGoalState(state):
+                path = nodePath(node)
+                break
+            successors = stats.successors(problem, state)
+            for nextState, nextAction, stepCost in reversed(successors):
+                if table.get(nextState, infinity) > cost + stepCost:
+                    stack.append((nextState, nextAction, node, cost + stepCost))
+            stats.frontierSize(len(stack))
+        stats.closedSize(len(table))
+        bound = nextBound
+    stats.finish()
+    return path
+
+def onPath(state, node):
+    "Returns whether state is the state of node or of one of its ancestors"
+    while node is not None:
+        if node[0] == state: return True
+        node = node[2]
+    return False
+
+# Largest number of search nodes SMA* keeps
+SMA_NODE_BUDGET = 100000
+
+class MemoryNode(object):
+    "A search tree node of memoryBoundedAStarSearch"
+    __slots__ = ('state', 'action', 'parent', 'cost', 'depth', 'f',
+                 'children', 'forgotten', 'expanded', 'alive', 'version')
+
+    def __init__(self, state, action, parent, cost, f):
+        self.state, self.action, self.parent, self.cost, self.f = state, action, parent, cost, f
+        self.depth = parent is not None and parent.depth + 1 or 0
+        self.children = {} # action -> MemoryNode, for the children in memory
+        self.forgotten = {} # action -> f, for the children dropped since the last expansion
+        self.expanded, self.alive, self.version = False, True, 0
+
+def memoryBoundedAStarSearch(problem, heuristic=nullHeuristic, nodeBudget=SMA_NODE_BUDGET):
+    """
+    Simplified memory-bounded A* (SMA*): A* over the search tree that never
+    keeps more than nodeBudget nodes.
+
+    When the budget is full, the shallowest leaf with the highest f is
+    dropped and its f is remembered by its parent, which goes back on the
+    frontier and regenerates the child if that f becomes the best again.
+    f-values are backed up from children to parents, so they only rise.  A
+    successor whose state is already in memory at no higher cost is not
+    generated, since the tree still holds that cheaper path.
+    Returns an optimal path when one fits in the budget (depth below
+    nodeBudget), or None.  The heuristic must be admissible.
+    """
+    stats = SearchStats('memoryBoundedAStarSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    nodeBudget = int(nodeBudget)
+    if nodeBudget < 2: raise ValueError('SMA* needs a node budget of at least 2')
+    infinity = float('inf')
+    counter = itertools.count()
+    # Unexpanded nodes are on the frontier with their f, and expanded nodes
+    # with the least f of their forgotten children, which expanding them
+    # again regenerates with those f-values
+    best = []  # (f, -depth, count, version, node) for frontier nodes
+    worst = [] # (-f, depth, count, version, node) for leaves other than the root
+
+    def publish(node):
+        "Records the node's current f, frontier and leaf status in the heaps"
+        node.version += 1
+        if not node.expanded:
+            heapq.heappush(best, (node.f, -node.depth, counter.next(), node.version, node))
+        elif node.forgotten:
+            heapq.heappush(best, (min(node.forgotten.values()), -node.depth, counter.next(), node.version, node))
+        if not node.children and node.parent is not None:
+            heapq.heappush(worst, (-node.f, node.depth, counter.next(), node.version, node))
+
+    def popValid(heap):
+        while heap:
+            entry = heapq.heappop(heap)
+            node = entry[-1]
+            if node.alive and entry[3] == node.version: return entry[0], node
+        return None, None
+
+    def backup(node):
+        "Raises f-values to the least f below them, from node up to the root"
+        while node is not None:
+            values = [child.f for child in node.children.values()] + node.forgotten.values()
+            f = min(values or [infinity]) # A node with nothing left below it is a dead end
+            if f <= node.f: return
+            node.f = f
+            publish(node)
+            node = node.parent
+
+    def republishAll():
+        "Rebuilds the heaps once stale entries outnumber the nodes"
+        del best[:], worst[:]
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            publish(node)
+            stack.extend(node.children.values())
+
+    start = problem.getStartState()
+    root = MemoryNode(start, None, None, 0, heuristic(start, problem))
+    inMemory = {start: root} # state -> its cheapest node in memory
+    used = 1
+    publish(root)
+    path = None
+    while True:
+        key, node = popValid(best)
+        if node is None or key == infinity: break
+        if problem.isGoalState(node.state):
+            path = []
+            while node.parent is not None:
+                path.append(node.action)
+                node = node.parent
+            path.reverse()
+            break
+
+        # Generate the successors that are not in memory, skipping cycles
+        onPath, ancestor = set(), node
+        while ancestor is not None:
+            onPath.add(ancestor.state)
+            ancestor = ancestor.parent
+        for nextState, action, stepCost in stats.successors(problem, node.state):
+            if nextState in onPath: continue
+            if node.expanded and action not in node.forgotten: continue
+            cost = node.cost + stepCost
+            if nextState in inMemory and inMemory[nextState].cost <= cost: continue
+            if node.depth + 2 >= nodeBudget and not problem.isGoalState(nextState):
+                f = infinity # No room below this node for a path to a goal
+            else:
+                f = max(node.f, node.forgotten.get(action, 0), cost + heuristic(nextState, problem))
+            child = MemoryNode(nextState, action, node, cost, f)
+            node.children[action] = child
+            inMemory[nextState] = child
+            used += 1
+            publish(child)
+        node.expanded, node.forgotten = True, {}
+        publish(node)
+        backup(node)
+
+        # Forget the worst leaves until the tree fits in the budget again,
+        # sparing the children just generated while there are other leaves
+        spared = [] # Worst first
+        while used > nodeBudget:
+            leaf = popValid(worst)[1]
+            if leaf is None:
+                leaf = spared.pop(0)
+            elif leaf.parent is node and leaf.f < infinity:
+                spared.append(leaf)
+                continue
+            parent = leaf.parent
+            del parent.children[leaf.action]
+            leaf.alive = False
+            if inMemory.get(leaf.state) is leaf: del inMemory[leaf.state]
+            used -= 1
+            if leaf.f < infinity: parent.forgotten[leaf.action] = leaf.f
+            publish(parent)
+            backup(parent)
+        for leaf in spared:
+            if leaf.alive: publish(leaf)
+        stats.frontierSize(len(best))
+        stats.closedSize(used)
+        if len(best) + len(worst) > 4 * nodeBudget + 64: republishAll()
+    stats.finish()
+    return path
+
+def jumpPointSearch(problem, heuristic=nullHeuristic):
+    """
+    A* over jump points for position problems on a uniform-cost 4-connected
+    grid, like the PositionSearchProblem and AnyFoodSearchProblem: states are
+    (x,y) positions, every step costs 1 and the problem has its walls Grid.
+    Returns the full list of actions to a goal, at the optimal cost.
+
+    Among the many shortest paths of an open grid, only those that turn
+    from vertical to horizontal as early as they can are searched: a
+    horizontal move may turn north or south at any cell, while a vertical
+    move only turns where a wall on the side it came from has just ended.
+    Straight runs are skipped in one jump that stops at goals and at cells
+    where such a turn leads somewhere, so only jump points reach the
+    frontier.  They are keyed on (position, direction of arrival), since
+    the turns allowed depend on both.
+
+    A problem whose costFn charges anything but 1 for some open cell is
+    handed to aStarSearch instead, since jumps skip the cells they cross.
+    """
+    costFn = getattr(problem, 'costFn', None)
+    if costFn is not None:
+        for position in problem.walls.asList(False):
+            if costFn(position) != 1: return aStarSearch(problem, heuristic)
+    stats = SearchStats('jumpPointSearch')
+    heuristic = stats.timedHeuristic(heuristic)
+    adjacency = getAdjacency(problem.walls)
+    legalMask, height = adjacency.legalMask, adjacency.height
+    moveBits = dict([(action, 1 << k) for k, action in enumerate(adjacency.ACTIONS)])
+    north, south, east, west = Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST
+    isGoal = problem.isGoalState
+    verticalJumps = {}
+
+    def canMove(x, y, action):
+        return legalMask[x * height + y] & moveBits[action]
 
-    util.raiseNotDefined()
+    def jumpVertically(x, y, action):
+        "Returns the first jump point north or south of (x,y), or None"
+        key = (x, y, action)
+        if key not in verticalJumps:
+            dy = action == north and 1 or -1
+            verticalJumps[key] = None
+            while canMove(x, y, action):
+                y += dy
+                if (isGoal((x, y)) or canMove(x, y, east) and not canMove(x, y - dy, east)
+                                   or canMove(x, y, west) and not canMove(x, y - dy, west)):
+                    verticalJumps[key] = (x, y)
+                    break
+        return verticalJumps[key]
 
+    def jumpHorizontally(x, y, action):
+        "Returns the first jump point east or west of (x,y), or None"
+        dx = action == east and 1 or -1
+        while canMove(x, y, action):
+            x += dx
+            if isGoal((x, y)) or jumpVertically(x, y, north) or jumpVertically(x, y, south):
+                return (x, y)
+        return None
 
+    # Nodes are ((position, arrival), (action, steps), parent, cost)
+    start = problem.getStartState()
+    frontier = priorityFrontier(lambda node: node[3] + heuristic(node[0][0], problem))
+    frontier.push(((start, None), None, None, 0))
+    closed = set()
+    path = None
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        state, segment, parent, cost = node
+        if state in closed: continue
+        closed.add(state)
+        (x, y), arrival = state
+        if isGoal((x, y)):
+            path = []
+            while node[2] is not None:
+                action, steps = node[1]
+                path[:0] = [action] * steps
+                node = node[2]
+            break
+        for nextPosition, action, stepCost in stats.successors(problem, (x, y)):
+            if arrival in (east, west):
+                if action == Actions.reverseDirection(arrival): continue
+            elif arrival in (north, south):
+                if action == Actions.reverseDirection(arrival): continue
+                if action in (east, west) and canMove(x, y - (arrival == north and 1 or -1), action): continue
+            if action in (east, west):
+                jumpPoint = jumpHorizontally(x, y, action)
+            else:
+                jumpPoint = jumpVertically(x, y, action)
+            if jumpPoint is None or (jumpPoint, action) in closed: continue
+            steps = abs(jumpPoint[0] - x) + abs(jumpPoint[1] - y)
+            frontier.push(((jumpPoint, action), (action, steps), node, cost + steps))
+        stats.frontierSize(len(frontier))
+    stats.closedSize(len(closed))
+    stats.finish()
+    return path
 
+def backwardPath(node):
+    "Returns the actions leading from a backward search node to the goal"
+    actions = []
+    while node[2] is not None:
+        actions.append(node[1])
+        node = node[2]
+    return actions
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
-ucs = uniformCostSearch
\ No newline at end of file
+ucs = uniformCostSearch
+bidir = bidirectionalSearch
+bidirAstar = bidirectionalAStarSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = memoryBoundedAStarSearch
+jps = jumpPointSearch
+wastar = weightedAStarSearch
+ara = anytimeRepairingAStarSearch
+beam = beamSearch
\ No newline at end of file
@@ -160,6 +160,15 @@ def parseHeuristic(heuristicText):
 
     return graphHeuristic
 
+def parseOptions(optionsText):
+    "Parses 'name=value,...' into keyword arguments for a search function"
+    options = {}
+    for option in optionsText.split(','):
+        if not option.strip(): continue
+        name, value = option.split('=')
+        options[name.strip()] = float(value) if '.' in value else int(value)
+    return options
+
 
 class GraphSearchTest(testClasses.TestCase):
 
@@ -173,6 +182,7 @@ class GraphSearchTest(testClasses.TestCase):
             self.heuristic = parseHeuristic(testDict['heuristic'])
         else:
             self.heuristic = None
+        self.options = parseOptions(testDict.get('options', ''))
 
     # Note that the return type of this function is a tripple:
     # (solution, expanded states, error message)
@@ -180,9 +190,9 @@ class GraphSearchTest(testClasses.TestCase):
         alg = getattr(search, self.alg)
         problem = GraphSearch(self.graph_text)
         if self.heuristic != None:
-            solution = alg(problem, self.heuristic)
+            solution = alg(problem, self.heuristic, **self.options)
         else:
-            solution = alg(problem)
+            solution = alg(problem, **self.options)
 
         if type(solution) != type([]):
             return None, None, 'The result of %s must be a list. (Instead, it is %s)' % (self.alg, type(solution))
@@ -252,6 +262,71 @@ class GraphSearchTest(testClasses.TestCase):
 
 
 
+class AnytimeBoundTest(testClasses.TestCase):
+    """
+    Runs an anytime search on a graph and checks that the path it returns
+    costs no more than the bound it reports (search.lastStats.notes['bound'])
+    times the optimal cost.
+    """
+
+    def __init__(self, question, testDict):
+        super(AnytimeBoundTest, self).__init__(question, testDict)
+        self.graph_text = testDict['graph']
+        self.alg = testDict['algorithm']
+        self.diagram = testDict['diagram']
+        self.weight = float(testDict.get('weight', '3'))
+        self.deadline = float(testDict.get('deadline', '10'))
+        if 'heuristic' in testDict:
+            self.heuristic = parseHeuristic(testDict['heuristic'])
+        else:
+            self.heuristic = None
+
+    def getSolInfo(self, search):
+        alg = getattr(search, self.alg)
+        problem = GraphSearch(self.graph_text)
+        heuristic = self.heuristic or search.nullHeuristic
+        solution = alg(problem, heuristic, weight=self.weight, deadline=self.deadline)
+        if type(solution) != type([]):
+            return None, None, 'The result of %s must be a list. (Instead, it is %s)' % (self.alg, type(solution))
+        if not checkSolution(problem, solution):
+            return None, None, 'The path returned by %s does not reach a goal' % self.alg
+        return problem.getCostOfActions(solution), search.lastStats.notes['bound'], None
+
+    def execute(self, grades, moduleDict, solutionDict):
+        search = moduleDict['search']
+        optimal = float(solutionDict['cost'])
+
+        cost, bound, error = self.getSolInfo(search)
+        if error != None:
+            grades.addMessage('FAIL: %s' % self.path)
+            grades.addMessage('\t%s' % error)
+            return False
+
+        if cost > bound * optimal:
+            grades.addMessage('FAIL: %s' % self.path)
+            grades.addMessage('\tgraph:')
+            for line in self.diagram.split('\n'):
+                grades.addMessage('\t    %s' % (line,))
+            grades.addMessage('\tpath cost %s is more than bound %s times the optimal cost %s' % (cost, bound, optimal))
+            return False
+
+        grades.addMessage('PASS: %s' % self.path)
+        grades.addMessage('\tpath cost:\t%s' % cost)
+        grades.addMessage('\tbound:\t\t%s' % bound)
+        return True
+
+    def writeSolution(self, moduleDict, filePath):
+        search = moduleDict['search']
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        problem = GraphSearch(self.graph_text)
+        cost = problem.getCostOfActions(search.uniformCostSearch(problem))
+        handle.write('cost: "%s"\n' % cost)
+        handle.close()
+        return True
+
+
+
 class PacmanSearchTest(testClasses.TestCase):
 
     def __init__(self, question, testDict):
@@ -265,6 +340,7 @@ class PacmanSearchTest(testClasses.TestCase):
         self.costFn = eval(testDict.get('costFn', 'None'))
         self.searchProblemClassName = testDict.get('searchProblemClass', 'PositionSearchProblem')
         self.heuristicName = testDict.get('heuristic', None)
+        self.options = parseOptions(testDict.get('options', ''))
 
 
     def getSolInfo(self, search, searchAgents):
@@ -281,9 +357,9 @@ class PacmanSearchTest(testClasses.TestCase):
         heuristic = getattr(searchAgents, self.heuristicName) if self.heuristicName != None else None
 
         if heuristic != None:
-            solution = alg(problem, heuristic)
+            solution = alg(problem, heuristic, **self.options)
         else:
-            solution = alg(problem)
+            solution = alg(problem, **self.options)
 
         if type(solution) != type([]):
             return None, None, 'The result of %s must be a list. (Instead, it is %s)' % (self.alg, type(solution))
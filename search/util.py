@@ -15,6 +15,7 @@
 import sys
 import inspect
 import heapq, random
+import collections
 import cStringIO
 
 
@@ -134,6 +135,9 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
@@ -154,6 +158,9 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -185,6 +192,9 @@ class PriorityQueue:
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -201,6 +211,260 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class IndexedPriorityQueue:
+    """
+      A binary heap priority queue that also records where each item sits in
+      the heap, so the priority of a queued item can be lowered in place
+      (decrease-key) instead of pushing a duplicate.  The queue therefore
+      never holds more entries than distinct items.
+
+      Items are indexed by key(item), which defaults to the item itself and
+      must be hashable.  Ties are broken first-in first-out, and an updated
+      item counts as newly inserted, so items come out in the same order as
+      from a PriorityQueue that skips stale duplicates.
+    """
+    def  __init__(self, key=None):
+        self.heap = []
+        self.index = {}
+        self.count = 0
+        self.key = key
+
+    def push(self, item, priority):
+        "Adds item to the queue, or lowers its priority if it is already queued"
+        self.update(item, priority)
+
+    def update(self, item, priority):
+        """
+          If item is already queued with a higher priority, lower its priority
+          and move it up the heap.  If it is queued with an equal or lower
+          priority, do nothing.  Otherwise add it to the queue.
+        """
+        key = self._keyOf(item)
+        i = self.index.get(key)
+        if i is None:
+            self.heap.append((priority, self.count, item, key))
+            i = len(self.heap) - 1
+            self.index[key] = i
+        elif priority < self.heap[i][0]:
+            self.heap[i] = (priority, self.count, item, key)
+        else:
+            return
+        self.count += 1
+        self._siftUp(i)
+
+    def pop(self):
+        heap = self.heap
+        last = heap.pop()
+        if heap:
+            (_, _, item, key) = heap[0]
+            heap[0] = last
+            self.index[last[3]] = 0
+            self._siftDown(0)
+        else:
+            (_, _, item, key) = last
+        del self.index[key]
+        return item
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __len__(self):
+        "Returns the number of live items in the queue"
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return self._keyOf(item) in self.index
+
+    def peekPriority(self):
+        "Returns the lowest priority in the queue, which must not be empty"
+        return self.heap[0][0]
+
+    def items(self):
+        "Returns the queued items, in no particular order"
+        return [entry[2] for entry in self.heap]
+
+    def footprint(self):
+        """
+          Returns (totalBytes, bytesPerEntry) used by the heap list, the index
+          dictionary and the heap entries, not counting the items themselves.
+        """
+        total = sys.getsizeof(self.heap) + sys.getsizeof(self.index)
+        for entry in self.heap:
+            total += sys.getsizeof(entry)
+        if not self.heap: return total, 0.0
+        return total, total / float(len(self.heap))
+
+    def _keyOf(self, item):
+        if self.key is None: return item
+        return self.key(item)
+
+    def _siftUp(self, i):
+        heap, index = self.heap, self.index
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not entry < heap[parent]: break
+            heap[i] = heap[parent]
+            index[heap[i][3]] = i
+            i = parent
+        heap[i] = entry
+        index[entry[3]] = i
+
+    def _siftDown(self, i):
+        heap, index = self.heap, self.index
+        n = len(heap)
+        entry = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n: break
+            if child + 1 < n and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry: break
+            heap[i] = heap[child]
+            index[heap[i][3]] = i
+            i = child
+        heap[i] = entry
+        index[entry[3]] = i
+
+class IndexedPriorityQueueWithFunction(IndexedPriorityQueue):
+    """
+    An IndexedPriorityQueue with the push/pop signature of the Queue and the
+    Stack classes, like PriorityQueueWithFunction.  Pushing an item whose key
+    is already queued keeps whichever of the two has the lower priority.
+    """
+    def  __init__(self, priorityFunction, key=None):
+        "priorityFunction (item) -> priority"
+        self.priorityFunction = priorityFunction
+        IndexedPriorityQueue.__init__(self, key)
+
+    def push(self, item):
+        "Adds an item to the queue with priority from the priority function"
+        IndexedPriorityQueue.push(self, item, self.priorityFunction(item))
+
+class BucketQueue:
+    """
+      A monotone bucket queue (as in Dial's algorithm) for small non-negative
+      integer priorities.  There is one FIFO bucket per priority and a cursor
+      at the lowest bucket that may be non-empty, so push is O(1) and pop only
+      scans forward over empty buckets.  Pushing below the cursor moves it
+      back, so non-monotone priorities still come out in order.
+
+      It has the same interface as IndexedPriorityQueue, including keyed
+      update (decrease-key), and pops items in the same order.  An updated
+      item's old entry is left in its bucket and skipped when reached.
+    """
+    MAX_PRIORITY = 1 << 16
+
+    def  __init__(self, key=None):
+        self.buckets = []
+        self.cursor = 0
+        self.index = {} # key -> (priority, count) of the item's live entry
+        self.count = 0
+        self.key = key
+
+    def accepts(self, priority):
+        "Returns true if priority is an integer that fits in a bucket"
+        return 0 <= priority <= self.MAX_PRIORITY and priority == int(priority)
+
+    def push(self, item, priority):
+        "Adds item to the queue, or lowers its priority if it is already queued"
+        self.update(item, priority)
+
+    def update(self, item, priority):
+        """
+          Same contract as IndexedPriorityQueue.update; raises ValueError if
+          the priority is not accepted.
+        """
+        if not self.accepts(priority):
+            raise ValueError('BucketQueue priority must be an integer in [0, %d]: %s' % (self.MAX_PRIORITY, priority))
+        key = self._keyOf(item)
+        live = self.index.get(key)
+        if live is not None and not priority < live[0]:
+            return
+        b = int(priority)
+        if b >= len(self.buckets):
+            self.buckets.extend([None] * (b + 1 - len(self.buckets)))
+        if self.buckets[b] is None:
+            self.buckets[b] = collections.deque()
+        self.buckets[b].append((self.count, item, key))
+        self.index[key] = (priority, self.count)
+        self.count += 1
+        if b < self.cursor: self.cursor = b
+
+    def pop(self):
+        if not self.index: raise IndexError('pop from an empty BucketQueue')
+        buckets, index = self.buckets, self.index
+        while True:
+            bucket = buckets[self.cursor]
+            while bucket:
+                count, item, key = bucket.popleft()
+                live = index.get(key)
+                if live is not None and live[1] == count:
+                    del index[key]
+                    return item
+            self.cursor += 1
+
+    def isEmpty(self):
+        return len(self.index) == 0
+
+    def __len__(self):
+        "Returns the number of live items in the queue"
+        return len(self.index)
+
+    def __contains__(self, item):
+        return self._keyOf(item) in self.index
+
+    def toHeap(self):
+        """
+          Returns an IndexedPriorityQueue holding the live items of this queue,
+          which pops them in the same order.
+        """
+        heap = IndexedPriorityQueue(self.key)
+        for bucket in self.buckets[self.cursor:]:
+            if not bucket: continue
+            for count, item, key in bucket:
+                live = self.index.get(key)
+                if live is not None and live[1] == count:
+                    heap.push(item, live[0])
+        return heap
+
+    def _keyOf(self, item):
+        if self.key is None: return item
+        return self.key(item)
+
+class CostPriorityQueueWithFunction:
+    """
+    The frontier for cost-ordered searches, with the push/pop signature of
+    PriorityQueueWithFunction.  Most search problems have small integer step
+    costs, so it starts out as a BucketQueue; the first time a priority is
+    pushed that the buckets do not accept (a fraction, a negative or a very
+    large number) its items move to an IndexedPriorityQueue, which is used
+    from then on.
+    """
+    def  __init__(self, priorityFunction, key=None):
+        "priorityFunction (item) -> priority"
+        self.priorityFunction = priorityFunction
+        self.queue = BucketQueue(key)
+
+    def push(self, item):
+        "Adds an item to the queue with priority from the priority function"
+        priority = self.priorityFunction(item)
+        if isinstance(self.queue, BucketQueue) and not self.queue.accepts(priority):
+            self.queue = self.queue.toHeap()
+        self.queue.push(item, priority)
+
+    def pop(self):
+        return self.queue.pop()
+
+    def isEmpty(self):
+        return self.queue.isEmpty()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __contains__(self, item):
+        return item in self.queue
+
 
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
@@ -577,6 +841,44 @@ def pause():
     print "<Press enter/return to continue>"
     raw_input()
 
+# code to cache precomputed tables on disk
+import mmap
+import os
+
+def loadCachedTable(directory, name, size):
+    """
+    Memory-maps the file name in the cache directory read-only, or returns
+    None if the directory is None or the file is missing or not size bytes.
+    """
+    if directory is None or size == 0: return None
+    fileName = os.path.join(directory, name)
+    if not os.path.exists(fileName): return None
+    f = open(fileName, 'rb')
+    try:
+        if os.path.getsize(fileName) != size: return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        f.close()
+
+def saveCachedTable(directory, name, table):
+    """
+    Writes an array (anything with tofile) to the file name in the cache
+    directory, unless the directory is None.  The file is written under a
+    temporary name and renamed, so readers never map half a table, and
+    failures only cost computing the table again later.
+    """
+    if directory is None: return
+    fileName = os.path.join(directory, name)
+    try:
+        if not os.path.isdir(directory): os.makedirs(directory)
+        tmpName = '%s.%d.tmp' % (fileName, os.getpid())
+        f = open(tmpName, 'wb')
+        try: table.tofile(f)
+        finally: f.close()
+        os.rename(tmpName, fileName)
+    except (IOError, OSError):
+        pass
+
 
 # code to handle timeouts
 #
@@ -586,6 +888,7 @@ def pause():
 # of active time outs.  Currently, questions which have test cases calling
 # this have all student code so wrapped.
 #
+import math
 import signal
 import time
 class TimeoutFunctionException(Exception):
@@ -621,6 +924,115 @@ class TimeoutFunction:
                 self.handle_timeout(None, None)
         return result
 
+class MoveTimer:
+    """
+    Runs agent calls with (fractional) second deadlines for one game.
+
+    Unlike TimeoutFunction, the SIGALRM handler is installed once, by
+    start(), and each call only arms and disarms the real interval timer.
+    stop() puts back the previous handler, and re-arms any alarm that was
+    pending when start() was called with the time it had left.  Without
+    SIGALRM, a call's time is checked after it returns.  The duration of
+    the latest call is kept in elapsed, whether or not it timed out.
+    """
+    def __init__(self):
+        self.useSignal = hasattr(signal, 'SIGALRM') and hasattr(signal, 'setitimer')
+        self.started = False
+        self.active = False
+        self.elapsed = 0.0
+
+    def start(self):
+        if not self.useSignal or self.started: return
+        self.started = True
+        self.startTime = time.time()
+        self.outerAlarm = signal.getitimer(signal.ITIMER_REAL)[0]
+        self.oldHandler = signal.signal(signal.SIGALRM, self.handle_timeout)
+
+    def stop(self):
+        if not self.started: return
+        self.started = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self.oldHandler)
+        if self.outerAlarm > 0:
+            remaining = self.outerAlarm - (time.time() - self.startTime)
+            signal.setitimer(signal.ITIMER_REAL, max(remaining, 0.001))
+
+    def handle_timeout(self, signum, frame):
+        if self.active: raise TimeoutFunctionException()
+
+    def call(self, timeout, function, *args):
+        """
+        Returns function(*args), or raises TimeoutFunctionException if it
+        runs for timeout seconds.
+        """
+        self.elapsed = 0.0
+        if timeout <= 0: raise TimeoutFunctionException()
+        armed = self.started
+        startTime = time.time()
+        if armed:
+            self.active = True
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            result = function(*args)
+        finally:
+            if armed:
+                self.active = False
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            self.elapsed = time.time() - startTime
+        if not armed and self.elapsed >= timeout:
+            raise TimeoutFunctionException()
+        return result
+
+class LatencyHistogram:
+    """
+    Counts durations in logarithmic buckets, BUCKETS_PER_DOUBLING to each
+    doubling from one microsecond, so adding one is a dictionary update and
+    percentiles are within 10% of the true value.
+    """
+    BUCKETS_PER_DOUBLING = 8
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds > 1e-6:
+            bucket = int(math.log(seconds * 1e6, 2) * LatencyHistogram.BUCKETS_PER_DOUBLING)
+        else:
+            bucket = 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max: self.max = seconds
+
+    def merge(self, other):
+        "Adds the durations counted by another histogram to this one"
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """
+        Returns the duration that p percent of the durations do not exceed
+        (the top of its bucket, or the maximum if that is smaller).
+        """
+        if self.count == 0: return 0.0
+        rank = max(1, int(math.ceil(p / 100.0 * self.count)))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank: break
+        top = 2 ** (float(bucket + 1) / LatencyHistogram.BUCKETS_PER_DOUBLING) * 1e-6
+        return min(top, self.max)
+
+    def __str__(self):
+        return '%d moves, p50 %.2fms, p99 %.2fms, max %.2fms' % \
+               (self.count, 1000 * self.percentile(50), 1000 * self.percentile(99), 1000 * self.max)
+
 
 
 _ORIGINAL_STDOUT = None